@@ -1,15 +1,52 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import Depends, FastAPI
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
-from fast_zero.routers import auth, todo, users
+from fast_zero.database import (
+    QueryStatsMiddleware,
+    ReadYourWritesMiddleware,
+    dispose_engine,
+    get_engine,
+    get_replica_set,
+)
+from fast_zero.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from fast_zero.routers import auth, health, todo, users
 from fast_zero.schemas import Message
+from fast_zero.security import password_hasher, require_diagnostics_token
+from fast_zero.settings import get_settings
+from fast_zero.warmup import warm_up, warmup_state
 
-app = FastAPI()
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the server only starts accepting connections once this returns
+    if settings.WARMUP_ENABLED:
+        await warm_up(
+            get_engine(),
+            settings.WARMUP_CONNECTIONS,
+            replicas=get_replica_set().engines,
+        )
+    else:
+        warmup_state.finish(0)
+
+    yield
+    # the server has stopped accepting requests and drained in-flight ones
+    password_hasher.shutdown()
+    await dispose_engine()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(todo.router)
+app.include_router(health.router)
 
 
 @app.get('/api', status_code=HTTPStatus.OK, response_model=Message)
@@ -17,6 +54,16 @@ def root_api():
     return {'message': 'Olá Mundo!'}
 
 
+@app.get(
+    '/metrics',
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(require_diagnostics_token)],
+)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
 @app.get('/', response_class=HTMLResponse)
 def root_html():
     return """
@@ -0,0 +1,212 @@
+import json
+from collections import OrderedDict
+from hashlib import blake2b
+from time import monotonic
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire ``ttl`` seconds after insertion.
+
+    A ``maxsize`` or ``ttl`` of zero disables the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        entry = self._data.get(key)
+
+        if entry is None or entry[0] <= monotonic():
+            self._data.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': hit_rate(self.hits, self.misses),
+        }
+
+
+def hit_rate(hits: int, misses: int) -> float:
+    return hits / (hits + misses) if hits + misses else 0.0
+
+
+class MemoryBackend:
+    """In-process response cache backend, local to each worker."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self.generations = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes):
+        self.entries.set(key, value)
+
+    async def generation(self, scope: str) -> int:
+        return self.generations.get(scope, 0)
+
+    async def bump(self, scope: str):
+        self.generations[scope] = self.generations.get(scope, 0) + 1
+
+    def clear(self):
+        self.entries.clear()
+        self.generations.clear()
+
+    def stats(self) -> dict:
+        return self.entries.stats()
+
+
+class RedisBackend:
+    """Response cache backend shared by all workers through Redis.
+
+    Size-bounded eviction is left to the server (``maxmemory`` with an LRU
+    policy); generation counters are stored without expiry.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = 'fast_zero:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> bytes | None:
+        value = await self.client.get(self.prefix + key)
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return value
+
+    async def set(self, key: str, value: bytes):
+        if self.ttl > 0:
+            await self.client.set(self.prefix + key, value, px=int(self.ttl * 1000))
+
+    async def generation(self, scope: str) -> int:
+        return int(await self.client.get(f'{self.prefix}generation:{scope}') or 0)
+
+    async def bump(self, scope: str):
+        await self.client.incr(f'{self.prefix}generation:{scope}')
+
+    def clear(self):
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': None,
+            'maxsize': None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': hit_rate(self.hits, self.misses),
+        }
+
+
+class ResponseCache:
+    """Serialized responses keyed by scope, generation and request parameters.
+
+    Bumping a scope's generation invalidates all of its entries at once: new
+    lookups use the new generation and the old entries age out.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    async def key(self, scope: str, params: dict) -> str | None:
+        if self.backend is None:
+            return None
+
+        normalized = json.dumps(
+            sorted(
+                (name, value)
+                for name, value in params.items()
+                if value not in {None, ''}
+            ),
+            default=str,
+        )
+        digest = blake2b(normalized.encode(), digest_size=16).hexdigest()
+        return f'{scope}:{await self.backend.generation(scope)}:{digest}'
+
+    async def get_value(self, key: str | None) -> bytes | None:
+        if key is None:
+            return None
+
+        return await self.backend.get(key)
+
+    async def set_value(self, key: str | None, value: bytes):
+        if key is not None:
+            await self.backend.set(key, value)
+
+    async def get(self, key: str | None) -> tuple[str, bytes] | None:
+        value = await self.get_value(key)
+        if value is None:
+            return None
+
+        etag, body = value.split(b'\n', 1)
+        return etag.decode(), body
+
+    async def set(self, key: str | None, etag: str, body: bytes):
+        await self.set_value(key, etag.encode() + b'\n' + body)
+
+    async def invalidate(self, scope: str):
+        if self.backend is not None:
+            await self.backend.bump(scope)
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        if self.backend is None:
+            return {'size': 0, 'maxsize': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+
+        return self.backend.stats()
+
+
+def response_cache_backend(backend: str, url: str, maxsize: int, ttl: float):
+    if backend == 'memory':
+        return MemoryBackend(maxsize, ttl)
+
+    if backend == 'redis':
+        from redis.asyncio import Redis  # noqa: PLC0415
+
+        return RedisBackend(Redis.from_url(url), ttl)
+
+    return None
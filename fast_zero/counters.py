@@ -0,0 +1,88 @@
+"""Repair of the per-state todo counters.
+
+``todo_state_counts`` is kept up to date by triggers on ``todo``; this
+recounts the todo rows and fixes any drift, one user per transaction::
+
+    python -m fast_zero.counters [--email user@example.com]
+"""
+
+import argparse
+import json
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from fast_zero.models import ToDo, ToDoState, ToDoStateCount, User
+from fast_zero.settings import get_settings
+
+
+def reconcile_user_sync(session: Session, user_id: int) -> dict:
+    """Recount one user's todos, returning the corrected ``{state: count}``."""
+    # exclusive against the triggers' shared lock: no write lands mid-recount
+    session.execute(
+        select(func.pg_advisory_xact_lock(func.hashtext('todo_state_counts'), user_id))
+    )
+
+    actual = dict(
+        session.execute(
+            select(ToDo.state, func.count())
+            .where(ToDo.user_id == user_id)
+            .group_by(ToDo.state)
+        ).all()
+    )
+    stored = dict(
+        session.execute(
+            select(ToDoStateCount.state, ToDoStateCount.count).where(
+                ToDoStateCount.user_id == user_id
+            )
+        ).all()
+    )
+    drift = {
+        state: actual.get(state, 0)
+        for state in ToDoState
+        if actual.get(state, 0) != stored.get(state, 0)
+    }
+
+    if drift:
+        statement = insert(ToDoStateCount).values([
+            {'user_id': user_id, 'state': state, 'count': count}
+            for state, count in drift.items()
+        ])
+        session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[ToDoStateCount.user_id, ToDoStateCount.state],
+                set_={'count': statement.excluded.count},
+            )
+        )
+
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Repair per-state todo counters.')
+    parser.add_argument('--email', help='only this user (default: every user)')
+    parser.add_argument('--database-url', help='default: the DATABASE_URL setting')
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url or get_settings().DATABASE_URL)
+    query = select(User.id).order_by(User.id)
+    if args.email:
+        query = query.where(User.email == args.email)
+
+    repaired = {}
+    with Session(engine) as session:
+        user_ids = session.scalars(query).all()
+        if args.email and not user_ids:
+            parser.error(f'unknown user {args.email}')
+
+        for user_id in user_ids:
+            if drift := reconcile_user_sync(session, user_id):
+                repaired[user_id] = drift
+            session.commit()
+
+    print(json.dumps({'users': len(user_ids), 'repaired': repaired}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,560 @@
-from sqlalchemy import create_engine
+import logging
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import cache, partial
+from http import HTTPStatus
+from itertools import count
+from threading import Lock
+from time import monotonic, perf_counter
+
+from jwt import decode
+from jwt.exceptions import PyJWTError
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+from fast_zero.cache import response_cache_backend
+from fast_zero.metrics import registry
+from fast_zero.settings import Settings, get_settings
+
+settings = get_settings()
+
+
+def engine_options(settings: Settings) -> dict:
+    if settings.DATABASE_NULL_POOL:
+        # Behind a transaction pooler (e.g. PgBouncer) every checkout may land
+        # on a different server connection, so server-side prepared
+        # statements must be disabled as well.
+        return {'poolclass': NullPool, 'connect_args': {'prepare_threshold': None}}
+
+    return {
+        'poolclass': TimedAsyncQueuePool if settings.DATABASE_ASYNC else TimedQueuePool,
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'pool_use_lifo': settings.DATABASE_POOL_USE_LIFO,
+    }
+
+
+slow_query_log = logging.getLogger('fast_zero.sql')
+
+
+class QueryStats:
+    """Statements issued on behalf of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds >= self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total * 1000:.1f};desc="{self.count} queries", '
+            f'db-slowest;dur={self.slowest * 1000:.1f}'
+        )
+
+
+# Set per request by QueryStatsMiddleware. Thread pool calls run in a copy
+# of the request's context, so they still record into the same object.
+query_stats: ContextVar[QueryStats | None] = ContextVar('query_stats', default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913 PLR0917
+    context.query_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913 PLR0917
+    seconds = perf_counter() - context.query_start
+
+    if (stats := query_stats.get()) is not None:
+        stats.record(statement, seconds)
+
+    if seconds * 1000 >= settings.DATABASE_SLOW_QUERY_MS:
+        slow_query_log.warning('slow query (%.1f ms): %s', seconds * 1000, statement)
+
+
+def instrument(engine):
+    """Time every statement run on ``engine`` into the current QueryStats."""
+    sync_engine = getattr(engine, 'sync_engine', engine)
+    event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+    return engine
+
+
+@cache
+def _create_engine():
+    # creating the engine imports the DB driver, which is a good part of
+    # the app's import time: it is deferred to the first use
+    if settings.DATABASE_ASYNC:
+        return instrument(
+            create_async_engine(settings.DATABASE_URL, **engine_options(settings))
+        )
+
+    return instrument(create_engine(settings.DATABASE_URL, **engine_options(settings)))
+
+
+_engine_lock = Lock()
+
+
+def get_engine():
+    """The application engine, created on first use."""
+    with _engine_lock:
+        return _create_engine()
+
+
+def _engine_created() -> bool:
+    return _create_engine.cache_info().currsize > 0
+
+
+class ReplicaSet:
+    """Round-robin over the read replicas, skipping the ones that failed.
+
+    A replica that cannot be connected to is left out for ``retry_after``
+    seconds; the first checkout after that is its health check.
+    """
+
+    def __init__(self, engines: list, retry_after: float):
+        self.engines = engines
+        self.retry_after = retry_after
+        self.down_until = dict.fromkeys(engines, 0.0)
+        self._turn = count()
+
+    def candidates(self) -> list:
+        """The healthy replicas, starting with the one whose turn it is."""
+        if not self.engines:
+            return []
+
+        start = next(self._turn) % len(self.engines)
+        now = monotonic()
+        return [
+            engine
+            for engine in self.engines[start:] + self.engines[:start]
+            if self.down_until[engine] <= now
+        ]
+
+    def mark_down(self, engine):
+        self.down_until[engine] = monotonic() + self.retry_after
+
+    def healthy(self) -> int:
+        now = monotonic()
+        return sum(until <= now for until in self.down_until.values())
+
+
+@cache
+def _create_replica_set() -> ReplicaSet:
+    options = engine_options(settings)
+    if options['poolclass'] is not NullPool:
+        # a replica that went away is found at checkout, not mid-request
+        options['pool_pre_ping'] = True
+
+    create = create_async_engine if settings.DATABASE_ASYNC else create_engine
+    return ReplicaSet(
+        [instrument(create(url, **options)) for url in settings.DATABASE_REPLICA_URLS],
+        settings.DATABASE_REPLICA_RETRY_SECONDS,
+    )
+
+
+def get_replica_set() -> ReplicaSet:
+    """The ``DATABASE_REPLICA_URLS`` engines, created on first use."""
+    with _engine_lock:
+        return _create_replica_set()
+
+
+def _created_engines() -> list:
+    # no lock: this also runs right after a fork, where it may be held forever
+    engines = [_create_engine()] if _engine_created() else []
+    if _create_replica_set.cache_info().currsize:
+        engines.extend(_create_replica_set().engines)
+
+    return engines
+
+
+def _reset_pool_after_fork():
+    # A forked worker inherits the parent's pooled sockets; talking over them
+    # from two processes corrupts both sessions. close=False leaves them for
+    # the parent and gives the child an empty pool of its own.
+    for engine in _created_engines():
+        getattr(engine, 'sync_engine', engine).dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+async def dispose_engine():
+    """Close every pooled connection, at shutdown once requests drained."""
+    for engine in _created_engines():
+        if settings.DATABASE_ASYNC:
+            await engine.dispose()
+        else:
+            await run_in_threadpool(engine.dispose)
+
+
+# Users that changed something recently, by token subject: their reads go
+# to the primary until the replicas have caught up. The memory backend is
+# per worker; with several workers the redis one lets every worker see the
+# write, wherever the next request lands.
+recent_writers = response_cache_backend(
+    settings.DATABASE_READ_YOUR_WRITES_BACKEND,
+    settings.DATABASE_READ_YOUR_WRITES_URL,
+    settings.DATABASE_READ_YOUR_WRITES_SIZE,
+    settings.DATABASE_READ_YOUR_WRITES_SECONDS,
+)
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def token_subject(authorization: str | None) -> str | None:
+    """The user behind a bearer ``Authorization`` header, if its token verifies.
+
+    Unlike the header itself, the subject stays the same across the tokens
+    a user is issued, e.g. by ``/auth/refresh_token``.
+    """
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+
+    try:
+        payload = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except PyJWTError:
+        return None
+
+    return payload.get('sub') or None
+
+
+def request_subject(request: Request) -> str | None:
+    """``token_subject`` of the request, decoded once and kept in its state."""
+    state = request.state
+    if not hasattr(state, 'token_subject'):
+        state.token_subject = token_subject(request.headers.get('authorization'))
+
+    return state.token_subject
+
+
+def _writer_key(subject: str) -> str:
+    return f'writer:{subject}'
+
+
+async def record_writer(*subjects: str):
+    """Send the reads of these users to the primary for a while.
+
+    Nothing to do without replicas: every read goes to the primary then.
+    """
+    if not get_replica_set().engines:
+        return
+
+    for subject in subjects:
+        await recent_writers.set(_writer_key(subject), b'1')
+
+
+class ReadYourWritesMiddleware:
+    """Records the user behind every successful write in ``recent_writers``."""
+
+    def __init__(self, app):
+        self.app = app
 
-from fast_zero.settings import Settings
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['method'] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
 
-engine = create_engine(Settings().DATABASE_URL)
+        async def send_and_record(message):
+            if (
+                message['type'] == 'http.response.start'
+                and message['status'] < HTTPStatus.BAD_REQUEST
+                and get_replica_set().engines
+                and (subject := request_subject(Request(scope)))
+            ):
+                await record_writer(subject)
+            await send(message)
 
+        await self.app(scope, receive, send_and_record)
 
-def get_session():  # pragma: no cover
-    with Session(engine) as session:
+
+class QueryStatsMiddleware:
+    """Collects a request's QueryStats and reports them in ``Server-Timing``.
+
+    The stats are also available to handlers as ``request.state.queries``.
+    Statements run by a streaming body after the headers are sent are
+    counted, but cannot be reported.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        scope.setdefault('state', {})['queries'] = stats
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).append(
+                    'Server-Timing', stats.server_timing()
+                )
+            await send(message)
+
+        token = query_stats.set(stats)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            query_stats.reset(token)
+
+
+class PoolWaitStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+pool_wait = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits in ``wait``.
+
+    Timing the checkout in the pool, rather than around the session, lets
+    the sessions check out their connection lazily, on their first query.
+    """
+
+    wait = pool_wait
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait.record(perf_counter() - start)
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine=None, wait: PoolWaitStats = pool_wait) -> dict:
+    if engine is None:
+        engine = get_engine()
+
+    pool = getattr(engine, 'sync_engine', engine).pool
+    stats = {
+        'pool': type(pool).__name__,
+        'size': 0,
+        'checked_out': 0,
+        'idle': 0,
+        'overflow': 0,
+        'wait_count': wait.count,
+        'wait_total_seconds': wait.total,
+        'wait_max_seconds': wait.max,
+    }
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # overflow() starts at -pool_size until the pool is filled
+            overflow=max(pool.overflow(), 0),
+        )
+
+    return stats
+
+
+db_pool_connections = registry.gauge(
+    'db_pool_connections', 'Database pool connections by state.', ('state',)
+)
+db_pool_waits = registry.counter(
+    'db_pool_waits_total', 'Connection checkouts from the pool.'
+)
+db_pool_wait_seconds = registry.counter(
+    'db_pool_wait_seconds_total', 'Time spent waiting for a pooled connection.'
+)
+
+
+db_replicas_up = registry.gauge('db_replicas_up', 'Read replicas in rotation.')
+replica_failures = registry.counter(
+    'db_replica_failures_total', 'Replica checkouts that failed over.'
+)
+
+
+@registry.collector
+def _collect_pool_metrics():
+    stats = pool_stats()
+    for state in ('size', 'checked_out', 'idle', 'overflow'):
+        db_pool_connections.set(stats[state], (state,))
+    db_pool_waits.set(stats['wait_count'])
+    db_pool_wait_seconds.set(stats['wait_total_seconds'])
+    db_replicas_up.set(get_replica_set().healthy())
+
+
+def _in_threadpool(name: str):
+    async def method(self, *args, **kwargs):
+        return await run_in_threadpool(getattr(self.sync_session, name), *args, **kwargs)
+
+    method.__name__ = name
+    return method
+
+
+class ThreadedResult:
+    """Async iteration over a streaming sync ``Result``, see ``AsyncResult``."""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size: int | None = None):
+        while rows := await run_in_threadpool(self.result.fetchmany, size):
+            yield rows
+
+
+class ThreadedSession:
+    """AsyncSession-compatible facade over a sync ``Session``.
+
+    Every blocking call runs on the anyio thread pool, so the routers can be
+    written once with ``await`` and still run on the sync engine.
+    """
+
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        statement = statement.execution_options(stream_results=True)
+        return ThreadedResult(await self.execute(statement, *args, **kwargs))
+
+    scalar = _in_threadpool('scalar')
+    scalars = _in_threadpool('scalars')
+    execute = _in_threadpool('execute')
+    get = _in_threadpool('get')
+    merge = _in_threadpool('merge')
+    delete = _in_threadpool('delete')
+    refresh = _in_threadpool('refresh')
+    flush = _in_threadpool('flush')
+    commit = _in_threadpool('commit')
+    rollback = _in_threadpool('rollback')
+    close = _in_threadpool('close')
+    connection = _in_threadpool('connection')
+
+
+async def acquire_connection(session):
+    """Check out the session's connection now instead of on its first query."""
+    await session.connection()
+
+
+async def release_connection(session):
+    """End the session's transaction, handing its connection back to the pool.
+
+    Loaded instances stay usable, as the sessions do not expire on commit,
+    and the next query checks a connection out again. For slow work that
+    does not need the database, such as password hashing.
+    """
+    await session.commit()
+
+
+@asynccontextmanager
+async def session_scope(engine=None):
+    if engine is None:
+        engine = get_engine()
+
+    if settings.DATABASE_ASYNC:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+    else:
+        # as on the AsyncSession path: no reload of every instance after a commit
+        session = ThreadedSession(Session(engine, expire_on_commit=False))
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def get_session():  # pragma: no cover
+    async with session_scope() as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session_scope(subject: str | None = None, replicas=None, primary=None):
+    """A session for reads only, on a replica when one is up.
+
+    Falls back to the primary when every replica is down, and always uses
+    it for a user (token ``subject``) in ``recent_writers``, who might
+    otherwise not see their own writes yet.
+    """
+    if replicas is None:
+        replicas = get_replica_set()
+
+    if replicas.engines and (
+        subject is None or await recent_writers.get(_writer_key(subject)) is None
+    ):
+        for replica in replicas.candidates():
+            async with session_scope(replica) as session:
+                try:
+                    await acquire_connection(session)
+                except OperationalError:
+                    replicas.mark_down(replica)
+                    replica_failures.inc()
+                    continue
+
+                yield session
+                return
+
+    async with session_scope(primary) as session:
         yield session
+
+
+async def get_read_session(request: Request):  # pragma: no cover
+    # without replicas there is nothing to pick, and no token to decode
+    replicas = get_replica_set()
+    subject = request_subject(request) if replicas.engines else None
+    async with read_session_scope(subject, replicas) as session:
+        yield session
+
+
+def get_read_session_scope(request: Request):
+    """``get_read_session`` as a factory, for a route to open only when needed.
+
+    A route that may answer from a cache opens its session after missing
+    it, so hits neither check out a connection nor pick a replica.
+    """
+    replicas = get_replica_set()
+    subject = request_subject(request) if replicas.engines else None
+    return partial(read_session_scope, subject, replicas)
+
+
+def get_session_scope():
+    """Session factory for work that outlives the request handler.
+
+    A streaming response body runs after the dependencies with ``yield``
+    have been closed, so it has to open (and close) its own session.
+    """
+    return session_scope
@@ -0,0 +1,27 @@
+"""Entity tags for conditional requests (RFC 9110, section 13)."""
+
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Response
+
+
+def make_etag(*parts) -> str:
+    digest = blake2b('\x1f'.join(map(str, parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(header: str, etag: str, weak: bool = False) -> bool:
+    """Whether ``etag`` is listed in an If-Match/If-None-Match header.
+
+    If-None-Match uses the weak comparison, If-Match the strong one.
+    """
+    tags = (tag.strip() for tag in header.split(','))
+    if weak:
+        tags = (tag.removeprefix('W/') for tag in tags)
+
+    return any(tag in {'*', etag} for tag in tags)
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': etag})
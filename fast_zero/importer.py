@@ -0,0 +1,302 @@
+"""Bulk import of todos through Postgres COPY.
+
+Used by ``POST /todo/import`` and from the command line::
+
+    python -m fast_zero.importer todos.csv --email user@example.com
+
+Input is parsed incrementally, validated against ``ToDoSchema`` and written
+in chunks, so memory stays bounded by the chunk size whatever the file size.
+"""
+
+import argparse
+import csv
+import io
+import json
+import re
+import sys
+
+from pydantic import ValidationError
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from fast_zero.database import ThreadedSession
+from fast_zero.models import User
+from fast_zero.schemas import ToDoSchema
+from fast_zero.settings import get_settings
+
+COPY_STATEMENT = 'COPY todo (title, description, state, user_id) FROM STDIN'
+CSV_FIELDS = ('title', 'description', 'state')
+# NUL is not allowed in Postgres text and a lone surrogate (from a JSON
+# escape) cannot be encoded: either would fail the whole COPY
+UNSTORABLE = re.compile('[\x00\ud800-\udfff]')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _ends_in_quotes(line: str, in_quotes: bool) -> bool:
+    """Whether a quoted field is still open at the end of ``line``.
+
+    Follows the default ``csv`` dialect: a quote only opens a field at its
+    start, ``""`` inside one is a literal quote, and a quote anywhere else
+    (``55" screen``) is just a character.
+    """
+    if '"' not in line:
+        return in_quotes
+
+    position = 0
+    while True:
+        if in_quotes:
+            closing = line.find('"', position)
+            if closing == -1:
+                return True
+            if line.startswith('"', closing + 1):
+                position = closing + 2
+            else:
+                in_quotes, position = False, closing + 1
+            continue
+
+        opening = line.find('"', position)
+        if opening == -1:
+            return False
+        # a new record, or right after a delimiter
+        if opening == 0 or line[opening - 1] == ',':
+            in_quotes = True
+        position = opening + 1
+
+
+class ToDoImporter:
+    def __init__(  # noqa: PLR0913 PLR0917
+        self,
+        user_id: int,
+        import_format: str,
+        chunk_size: int = 5000,
+        max_errors: int = 100,
+        max_record_size: int = 1 << 20,
+    ):
+        self.user_id = user_id
+        self.import_format = import_format
+        self.chunk_size = chunk_size
+        self.max_errors = max_errors
+        self.max_record_size = max_record_size
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self._line_number = 0
+        self._record_line = 0
+        self._buffer = ''
+        self._record = ''
+        self._in_quotes = False
+        self._record_too_long = False
+        self._header = None
+        self._rows = []
+
+    def feed(self, text: str):
+        *lines, self._buffer = (self._buffer + text).split('\n')
+        for line in lines:
+            self._feed_line(line)
+
+        if len(self._buffer) > self.max_record_size:
+            raise ImportFormatError(
+                f'Line {self._line_number + 1} is longer than '
+                f'{self.max_record_size} characters.'
+            )
+
+    def finish(self):
+        if self._buffer:
+            self._feed_line(self._buffer)
+            self._buffer = ''
+
+        if self._in_quotes:
+            self._reject(self._record_line, 'Unterminated quoted field.')
+            self._record, self._in_quotes = '', False
+            self._record_too_long = False
+
+    def ready(self) -> bool:
+        return len(self._rows) >= self.chunk_size
+
+    def take(self) -> list[tuple]:
+        rows, self._rows = self._rows, []
+        self.imported += len(rows)
+        return rows
+
+    def report(self) -> dict:
+        return {
+            'imported': self.imported,
+            'rejected': self.rejected,
+            'errors': self.errors,
+        }
+
+    def _feed_line(self, line: str):
+        self._line_number += 1
+
+        if self.import_format == 'csv':
+            if not self._in_quotes:
+                self._record_line = self._line_number
+            # a quoted field may contain newlines: wait for the closing quote
+            self._in_quotes = _ends_in_quotes(line, self._in_quotes)
+            if len(self._record) + len(line) >= self.max_record_size:
+                # keep following the quotes, but stop holding the text
+                self._record, self._record_too_long = '', True
+            elif not self._record_too_long:
+                self._record += line + '\n'
+            if self._in_quotes:
+                return
+            line, self._record = self._record.rstrip('\r\n'), ''
+
+            if self._record_too_long:
+                self._record_too_long = False
+                self._reject(
+                    self._record_line,
+                    f'Record is longer than {self.max_record_size} characters.',
+                )
+                return
+
+        if not line.strip():
+            return
+
+        if self.import_format == 'csv':
+            record = self._parse_csv(line)
+        else:
+            record = self._parse_ndjson(line)
+
+        if record is not None:
+            self._validate(record)
+
+    def _parse_csv(self, line: str):
+        values = next(csv.reader([line]))
+
+        if self._header is None:
+            missing = set(CSV_FIELDS) - set(values)
+            if missing:
+                raise ImportFormatError(
+                    f'CSV header is missing: {", ".join(sorted(missing))}.'
+                )
+            self._header = values
+            return None
+
+        if len(values) != len(self._header):
+            self._reject(self._record_line, f'Expected {len(self._header)} fields.')
+            return None
+
+        return dict(zip(self._header, values))
+
+    def _parse_ndjson(self, line: str):
+        try:
+            return json.loads(line)
+        except ValueError:
+            self._reject(self._line_number, 'Invalid JSON.')
+            return None
+
+    def _validate(self, record):
+        line_number = (
+            self._record_line if self.import_format == 'csv' else self._line_number
+        )
+
+        try:
+            todo = ToDoSchema.model_validate(record)
+        except ValidationError as exc:
+            self._reject(
+                line_number,
+                '; '.join(
+                    f'{".".join(map(str, error["loc"])) or "record"}: {error["msg"]}'
+                    for error in exc.errors()
+                ),
+            )
+            return
+
+        unstorable = [
+            field
+            for field in ('title', 'description')
+            if UNSTORABLE.search(getattr(todo, field))
+        ]
+        if unstorable:
+            self._reject(
+                line_number,
+                '; '.join(
+                    f'{field}: Contains a character that cannot be stored'
+                    for field in unstorable
+                ),
+            )
+            return
+
+        self._rows.append((todo.title, todo.description, todo.state.value, self.user_id))
+
+    def _reject(self, line_number: int, detail: str):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line_number, 'detail': detail})
+
+
+def copy_rows_sync(session: Session, rows: list[tuple]):
+    driver_connection = session.connection().connection.driver_connection
+    with driver_connection.cursor() as cursor, cursor.copy(COPY_STATEMENT) as copy:
+        for row in rows:
+            copy.write_row(row)
+
+
+async def copy_rows(session, rows: list[tuple]):
+    if not rows:
+        return
+
+    if isinstance(session, ThreadedSession):
+        await session.run_sync(copy_rows_sync, rows)
+        return
+
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    async with raw_connection.driver_connection.cursor() as cursor:
+        async with cursor.copy(COPY_STATEMENT) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Import todos with COPY.')
+    parser.add_argument('path', help='CSV or NDJSON file, "-" for stdin')
+    parser.add_argument('--email', required=True, help='owner of the todos')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), default=None)
+    parser.add_argument('--chunk-size', type=int, default=None)
+    parser.add_argument('--database-url', help='default: the DATABASE_URL setting')
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    import_format = args.format or (
+        'ndjson' if args.path.endswith(('.ndjson', '.jsonl')) else 'csv'
+    )
+    engine = create_engine(args.database_url or settings.DATABASE_URL)
+    # utf-8-sig: a byte order mark would otherwise end up in the CSV header
+    source = (
+        io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8-sig')
+        if args.path == '-'
+        else open(args.path, encoding='utf-8-sig')  # noqa: SIM115
+    )
+
+    with source, Session(engine) as session:
+        user_id = session.scalar(select(User.id).where(User.email == args.email))
+        if user_id is None:
+            parser.error(f'unknown user {args.email}')
+
+        importer = ToDoImporter(
+            user_id,
+            import_format,
+            chunk_size=args.chunk_size or settings.TODO_IMPORT_CHUNK_SIZE,
+        )
+        try:
+            for text in iter(lambda: source.read(1 << 16), ''):
+                importer.feed(text)
+                if importer.ready():
+                    copy_rows_sync(session, importer.take())
+            importer.finish()
+        except ImportFormatError as exc:
+            parser.error(str(exc))
+
+        copy_rows_sync(session, importer.take())
+        session.commit()
+
+    print(json.dumps(importer.report(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
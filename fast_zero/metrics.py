@@ -0,0 +1,204 @@
+"""In-process metrics in the Prometheus text exposition format.
+
+Recording a sample is a dict update, plus a bisect over the bucket bounds
+for histograms, so instrumentation can stay on in production. Values that
+mirror state kept elsewhere (the connection pool) are read by collectors
+at scrape time instead of on every change.
+
+The registry is per process: with several workers a scrape reads the one
+that answers it, see ``fast_zero.server``.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ''
+
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = {}
+
+    def set(self, value: float, labels: tuple = ()):
+        self.values[labels] = value
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _format_labels(self.labels, labels), value
+
+    def render(self) -> list[str]:
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+        lines.extend(f'{name}{labels} {value}' for name, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple = (),
+        buckets: tuple = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: tuple = ()):
+        state = self.values.get(labels)
+        if state is None:
+            # per-bucket counts (the last one is +Inf) and the running sum
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    @contextmanager
+    def time(self, labels: tuple = ()):
+        """Observe the duration of the block, unless it raises."""
+        start = perf_counter()
+        yield
+        self.observe(perf_counter() - start, labels)
+
+    def samples(self):
+        names = (*self.labels, 'le')
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    _format_labels(names, (*labels, bound)),
+                    cumulative,
+                )
+            yield f'{self.name}_sum', _format_labels(self.labels, labels), total
+            yield f'{self.name}_count', _format_labels(self.labels, labels), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), **kw):
+        return self.register(Histogram(name, documentation, labels, **kw))
+
+    def collector(self, fn):
+        """Register ``fn`` to refresh mirrored values before each scrape."""
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            collect()
+
+        lines = [line for metric in self.metrics for line in metric.render()]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    'http_requests_total',
+    'HTTP requests by route and status.',
+    ('method', 'route', 'status'),
+)
+http_in_flight = registry.gauge('http_requests_in_flight', 'HTTP requests being served.')
+http_in_flight.set(0)
+http_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency.', ('method', 'route')
+)
+http_response_size = registry.histogram(
+    'http_response_size_bytes',
+    'HTTP response body size.',
+    ('method', 'route'),
+    buckets=SIZE_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the ``http_*`` metrics.
+
+    Requests are labelled with the matched route's path template, never the
+    raw path, so ids in URLs do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        http_in_flight.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            http_in_flight.dec()
+            # the router stores the matched route in the shared scope
+            route = getattr(scope.get('route'), 'path', 'unmatched')
+            labels = (scope['method'], route)
+            http_duration.observe(perf_counter() - start, labels)
+            http_response_size.observe(size, labels)
+            http_requests.inc((*labels, str(status)))
@@ -1,11 +1,18 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, ForeignKey, Index, event, func, text
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+# trigram operator classes for the title/description substring filters
+event.listen(
+    table_registry.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'),
+)
+
 
 class ToDoState(str, Enum):
     draft = 'draft'
@@ -33,6 +40,23 @@ class User:
 @table_registry.mapped_as_dataclass
 class ToDo:
     __tablename__ = 'todo'
+    __table_args__ = (
+        # every route filters by owner; these also serve ORDER BY id paging
+        Index('ix_todo_user_id_id', 'user_id', 'id'),
+        Index('ix_todo_user_id_state_id', 'user_id', 'state', 'id'),
+        Index(
+            'ix_todo_title_trgm',
+            'title',
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+        ),
+        Index(
+            'ix_todo_description_trgm',
+            'description',
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
@@ -46,3 +70,99 @@ class ToDo:
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
 
     user: Mapped[User] = relationship(init=False, back_populates='todos')
+
+
+@table_registry.mapped_as_dataclass
+class ToDoStateCount:
+    """Number of todos per owner and state, kept by the todo triggers."""
+
+    __tablename__ = 'todo_state_counts'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[ToDoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+def todo_search_vector(title, description):
+    """Weighted full-text document of a todo, title ranked above description.
+
+    Queries must use this exact expression for Postgres to match it against
+    ix_todo_search, so the constants are rendered inline rather than bound.
+    """
+    config = text("'simple'::regconfig")
+    title_document = func.setweight(func.to_tsvector(config, title), text("'A'"))
+    description_document = func.setweight(
+        func.to_tsvector(config, description), text("'B'")
+    )
+    return title_document.op('||')(description_document)
+
+
+def todo_search_query(q: str):
+    return func.websearch_to_tsquery(text("'simple'::regconfig"), q)
+
+
+Index(
+    'ix_todo_search',
+    todo_search_vector(ToDo.__table__.c.title, ToDo.__table__.c.description),
+    postgresql_using='gin',
+)
+
+
+# Statement-level triggers fold each INSERT/UPDATE/DELETE/COPY on todo into
+# one upsert per (user, state). They take a shared per-user advisory lock
+# that reconcile_state_counts takes exclusively, so a repair never races a
+# write. Changing them needs a migration, see 5d8e2f7a9c13.
+TODO_STATE_DELTAS = {
+    'insert': 'SELECT user_id, state, 1 AS delta FROM new_rows',
+    'update': (
+        'SELECT user_id, state, 1 AS delta FROM new_rows '
+        'UNION ALL SELECT user_id, state, -1 FROM old_rows'
+    ),
+    'delete': 'SELECT user_id, state, -1 AS delta FROM old_rows',
+}
+TODO_STATE_TRANSITIONS = {
+    'insert': 'NEW TABLE AS new_rows',
+    'update': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'delete': 'OLD TABLE AS old_rows',
+}
+
+
+def todo_state_count_ddl(operation: str) -> tuple[str, str]:
+    """The trigger function and trigger for one kind of todo write."""
+    deltas = TODO_STATE_DELTAS[operation]
+    return (
+        f"""
+        CREATE OR REPLACE FUNCTION todo_state_counts_{operation}() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock_shared(
+                hashtext('todo_state_counts'), user_id
+            )
+            FROM (SELECT DISTINCT user_id FROM ({deltas}) AS deltas ORDER BY 1) AS o;
+
+            INSERT INTO todo_state_counts AS counts (user_id, state, count)
+            SELECT user_id, state, sum(delta) FROM ({deltas}) AS deltas
+            GROUP BY user_id, state
+            HAVING sum(delta) <> 0
+            ORDER BY user_id, state
+            ON CONFLICT (user_id, state)
+            DO UPDATE SET count = counts.count + excluded.count;
+
+            RETURN NULL;
+        END
+        $$
+        """,
+        f"""
+        CREATE TRIGGER todo_state_counts_{operation}
+        AFTER {operation.upper()} ON todo
+        REFERENCING {TODO_STATE_TRANSITIONS[operation]}
+        FOR EACH STATEMENT EXECUTE FUNCTION todo_state_counts_{operation}()
+        """,
+    )
+
+
+for operation in TODO_STATE_DELTAS:
+    for statement in todo_state_count_ddl(operation):
+        event.listen(ToDo.__table__, 'after_create', DDL(statement))
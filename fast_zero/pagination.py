@@ -0,0 +1,60 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+
+def encode_cursor(**position) -> str:
+    """Opaque continuation token holding the sort key of the last row sent."""
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, *keys: str) -> dict:
+    try:
+        raw = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        position = json.loads(raw)
+        return {key: int(position[key]) for key in keys}
+    except (binascii.Error, ValueError, TypeError, KeyError, OverflowError):
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor.')
+
+
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement, keeping its bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) ' + compiler.process(element.statement, **kw)
+
+
+def _unpaged(query):
+    return query.order_by(None).limit(None).offset(None)
+
+
+async def exact_count(session, query) -> int:
+    counted = select(func.count()).select_from(_unpaged(query).subquery())
+    return await session.scalar(counted)
+
+
+async def capped_count(session, query, cap: int) -> tuple[int, bool]:
+    """Count at most ``cap`` rows; the flag is set when there are more."""
+    sample = _unpaged(query).limit(cap + 1).subquery()
+    total = await session.scalar(select(func.count()).select_from(sample))
+    return min(total, cap), total > cap
+
+
+async def estimated_count(session, query) -> int:
+    """The planner's row estimate: no rows are read, but it may be far off."""
+    plan = await session.scalar(Explain(_unpaged(query)))
+    return int(plan[0]['Plan']['Plan Rows'])
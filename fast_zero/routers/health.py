@@ -0,0 +1,37 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, Depends, Response
+
+from fast_zero.database import pool_stats
+from fast_zero.routers.todo import response_cache
+from fast_zero.schemas import CacheStatsSchema, PoolStatsSchema, ReadinessSchema
+from fast_zero.security import require_diagnostics_token, user_cache
+from fast_zero.warmup import warmup_state
+
+router = APIRouter(prefix='/health', tags=['health'])
+
+
+@router.get(
+    '/pool',
+    response_model=PoolStatsSchema,
+    dependencies=[Depends(require_diagnostics_token)],
+)
+def get_pool_stats():
+    return pool_stats()
+
+
+@router.get(
+    '/cache',
+    response_model=dict[str, CacheStatsSchema],
+    dependencies=[Depends(require_diagnostics_token)],
+)
+def get_cache_stats():
+    return {'user': user_cache.stats(), 'todo_list': response_cache.stats()}
+
+
+@router.get('/ready', response_model=ReadinessSchema)
+def get_readiness(response: Response):
+    if not warmup_state.ready:
+        response.status_code = HTTPStatus.SERVICE_UNAVAILABLE
+
+    return {'ready': warmup_state.ready, 'warmup_seconds': warmup_state.seconds}
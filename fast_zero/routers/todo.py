@@ -1,29 +1,109 @@
+import codecs
+import csv
+import io
+import json
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
-from fast_zero.models import ToDo, ToDoState, User
+from fast_zero.cache import ResponseCache, response_cache_backend
+from fast_zero.database import (
+    get_read_session,
+    get_read_session_scope,
+    get_session,
+    get_session_scope,
+)
+from fast_zero.etag import etag_matches, make_etag, not_modified
+from fast_zero.importer import ImportFormatError, ToDoImporter, copy_rows
+from fast_zero.models import (
+    ToDo,
+    ToDoState,
+    ToDoStateCount,
+    User,
+    todo_search_query,
+    todo_search_vector,
+)
+from fast_zero.pagination import (
+    capped_count,
+    decode_cursor,
+    encode_cursor,
+    estimated_count,
+    exact_count,
+)
 from fast_zero.schemas import (
     Message,
     PaginationBase,
+    ToDoBulkCreateSchema,
+    ToDoBulkDeleteSchema,
+    ToDoBulkSchema,
+    ToDoBulkUpdateSchema,
+    ToDoImportSchema,
     ToDoPublicSchema,
     ToDoSchema,
+    ToDoSelectionSchema,
+    ToDoStatsSchema,
     TodoUpdateSchema,
 )
-from fast_zero.security import get_current_user
+from fast_zero.security import (
+    get_current_reader,
+    get_current_user,
+    get_token_subject,
+    user_for_subject,
+)
+from fast_zero.serialization import dumps, json_response, rows_to_dicts
+from fast_zero.settings import get_settings
+
+settings = get_settings()
 
 router = APIRouter(prefix='/todo', tags=['todo'])
 
-Session = Annotated[Session, Depends(get_session)]
+# list pages, invalidated per user by every todo write
+response_cache = ResponseCache(
+    response_cache_backend(
+        settings.TODO_CACHE_BACKEND,
+        settings.TODO_CACHE_URL,
+        settings.TODO_CACHE_SIZE,
+        settings.TODO_CACHE_TTL,
+    )
+)
+
+Session = Annotated[AsyncSession, Depends(get_session)]
+SessionScope = Annotated[object, Depends(get_session_scope)]
+# read-only routes: a replica when one is configured and up
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+ReadSessionScope = Annotated[object, Depends(get_read_session_scope)]
+Subject = Annotated[str, Depends(get_token_subject)]
+Reader = Annotated[User, Depends(get_current_reader)]
 User = Annotated[User, Depends(get_current_user)]
 
+ToDoPage = PaginationBase[ToDoPublicSchema]
+
+
+def _cache_scope(subject: str) -> str:
+    # by token subject, so a hit needs neither the user nor a session
+    return f'todo:{subject}'
+
+
+async def invalidate_to_do_pages(*subjects: str):
+    """Drop the cached pages of these users, e.g. when an e-mail changes hands."""
+    for subject in subjects:
+        await response_cache.invalidate(_cache_scope(subject))
+
 
 @router.post('/', response_model=ToDoPublicSchema, status_code=HTTPStatus.CREATED)
-def create_todo(
+async def create_todo(
     todo: ToDoSchema,
     user: User,
     session: Session,
@@ -36,24 +116,153 @@ def create_todo(
     )
 
     session.add(db_todo)
-    session.commit()
-    session.refresh(db_todo)
+    # read before the commit: a session that expires on commit would reload it
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
+    await session.refresh(db_todo)
 
     return db_todo
 
 
-@router.get('/', response_model=PaginationBase[ToDoPublicSchema])
-def list_to_dos(  # noqa: PLR0913 PLR0917
+@router.post('/bulk', response_model=ToDoBulkSchema, status_code=HTTPStatus.CREATED)
+async def create_todos_bulk(
+    todos: ToDoBulkCreateSchema,
+    user: User,
     session: Session,
+):
+    """Create all the todos, or none of them.
+
+    A batch with an invalid item, or more than ``TODO_BULK_MAX_ITEMS`` items,
+    is rejected as a whole with 422; the error's ``loc`` gives the index.
+    """
+    if not todos:
+        return {'result': []}
+
+    # one multi-row INSERT ... RETURNING; rows come back in request order
+    statement = insert(ToDo).returning(
+        *ToDo.__table__.columns, sort_by_parameter_order=True
+    )
+    result = await session.execute(
+        statement,
+        [{'user_id': user.id, **todo.model_dump()} for todo in todos],
+    )
+    to_dos = result.all()
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
+
+    return {'result': to_dos}
+
+
+@router.post('/import', response_model=ToDoImportSchema)
+async def import_to_dos(
+    request: Request,
     user: User,
-    title: str = None,
-    description: str = None,
-    state: ToDoState | None = None,
-    offset: int = 0,
-    limit: int = 10,
+    session: Session,
+    import_format: Literal['csv', 'ndjson'] = Query('csv', alias='format'),
 ):
-    query = select(ToDo).where(ToDo.user_id == user.id)
+    importer = ToDoImporter(
+        user.id,
+        import_format,
+        chunk_size=settings.TODO_IMPORT_CHUNK_SIZE,
+        max_errors=settings.TODO_IMPORT_MAX_ERRORS,
+    )
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+
+    # the body is consumed as it arrives and written with COPY chunk by chunk
+    try:
+        async for chunk in request.stream():
+            importer.feed(decoder.decode(chunk))
+            if importer.ready():
+                await copy_rows(session, importer.take())
+        importer.feed(decoder.decode(b'', final=True))
+        importer.finish()
+    except ImportFormatError as exc:
+        await session.rollback()
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(exc))
+
+    await copy_rows(session, importer.take())
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
+
+    return importer.report()
 
+
+def _selected(user, selection: ToDoSelectionSchema):
+    conditions = [ToDo.user_id == user.id]
+
+    if selection.ids is not None:
+        conditions.append(ToDo.id.in_(selection.ids))
+
+    if selection.state:
+        conditions.append(ToDo.state == selection.state)
+
+    if selection.title:
+        conditions.append(ToDo.title.icontains(selection.title))
+
+    return conditions
+
+
+@router.patch('/bulk', response_model=ToDoBulkSchema)
+async def edit_to_dos_bulk(
+    selection: ToDoBulkUpdateSchema,
+    session: Session,
+    user: User,
+):
+    """Apply ``changes`` to every selected todo in one statement.
+
+    All of them change or, on any error, none do. Ids that are not the
+    user's are skipped and left out of the result.
+    """
+    changes = selection.changes.model_dump(exclude_unset=True)
+
+    if not changes:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='No changes.')
+
+    result = await session.execute(
+        update(ToDo)
+        .where(*_selected(user, selection))
+        .values(**changes)
+        .returning(*ToDo.__table__.columns)
+        .execution_options(synchronize_session=False)
+    )
+    to_dos = result.all()
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
+
+    return {'result': to_dos}
+
+
+@router.post('/bulk/delete', response_model=ToDoBulkDeleteSchema)
+async def delete_to_dos_bulk(
+    selection: ToDoSelectionSchema,
+    session: Session,
+    user: User,
+):
+    """Delete every selected todo in one statement, returning their ids.
+
+    All of them go or, on any error, none do. Ids that are not the user's
+    are skipped and left out of the result.
+    """
+    result = await session.execute(
+        delete(ToDo)
+        .where(*_selected(user, selection))
+        .returning(ToDo.id)
+        .execution_options(synchronize_session=False)
+    )
+    ids = result.scalars().all()
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
+
+    return {'ids': ids}
+
+
+def _filter_to_dos(query, title, description, state, q):  # noqa: PLR0913 PLR0917
+    # substring filters are served by the pg_trgm GIN indexes
     if title:
         query = query.filter(ToDo.title.icontains(title))
 
@@ -63,57 +272,321 @@ def list_to_dos(  # noqa: PLR0913 PLR0917
     if state:
         query = query.filter(ToDo.state == state)
 
-    to_dos = session.scalars(query.offset(offset).limit(limit))
+    if q:
+        document = todo_search_vector(ToDo.title, ToDo.description)
+        query = query.filter(document.op('@@')(todo_search_query(q)))
 
-    return {'result': to_dos, 'offset': offset, 'limit': limit}
+    return query
 
 
-@router.get('/{todo_id}', response_model=ToDoPublicSchema)
-def get_to_do(todo_id: int, session: Session, user: User):
-    to_do_db = session.scalar(
-        select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
+def _to_do_etag(to_do) -> str:
+    return make_etag(to_do.id, to_do.updated_at.isoformat())
+
+
+def _page_etag(user, offset, limit, q, to_dos, totals) -> str:  # noqa: PLR0913 PLR0917
+    # the page body is fully determined by its rows and the paging parameters
+    return make_etag(
+        user.id,
+        offset,
+        limit,
+        bool(q),
+        *totals.values(),
+        *(_to_do_etag(to_do) for to_do in to_dos),
+    )
+
+
+async def _count_to_dos(session, user, strategy, query, filters) -> dict:  # noqa: PLR0913 PLR0917
+    if strategy == 'none':
+        return {'total': None, 'total_relation': None}
+
+    if not (filters['title'] or filters['description'] or filters['q']):
+        # owner and state alone are answered by the per-state counters
+        counted = select(func.coalesce(func.sum(ToDoStateCount.count), 0)).where(
+            ToDoStateCount.user_id == user.id
+        )
+        if filters['state']:
+            counted = counted.where(ToDoStateCount.state == filters['state'])
+        return {'total': await session.scalar(counted), 'total_relation': 'eq'}
+
+    if strategy == 'capped':
+        total, more = await capped_count(session, query, settings.TODO_COUNT_CAP)
+        return {'total': total, 'total_relation': 'gte' if more else 'eq'}
+
+    if strategy == 'estimated':
+        total = await estimated_count(session, query)
+        return {'total': total, 'total_relation': 'approx'}
+
+    # exact counts stay valid until the user's next write
+    key = await response_cache.key(
+        _cache_scope(user.email), {**filters, 'total': 'exact'}
+    )
+    if (cached := await response_cache.get_value(key)) is not None:
+        return {'total': int(cached), 'total_relation': 'eq'}
+
+    total = await exact_count(session, query)
+    await response_cache.set_value(key, str(total).encode())
+    return {'total': total, 'total_relation': 'eq'}
+
+
+@router.get('/', response_model=ToDoPage)
+async def list_to_dos(  # noqa: PLR0913 PLR0917
+    read_session: ReadSessionScope,
+    subject: Subject,
+    title: str = None,
+    description: str = None,
+    state: ToDoState | None = None,
+    q: str | None = None,
+    offset: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+    total: Literal['none', 'exact', 'capped', 'estimated'] = 'none',
+    if_none_match: str | None = Header(None),
+):
+    filters = {'title': title, 'description': description, 'state': state, 'q': q}
+    cache_key = await response_cache.key(
+        _cache_scope(subject),
+        {
+            **filters,
+            'offset': offset,
+            'limit': limit,
+            'cursor': cursor,
+            'total': total,
+        },
+    )
+    if cached := await response_cache.get(cache_key):
+        etag, body = cached
+        if if_none_match and etag_matches(if_none_match, etag, weak=True):
+            return not_modified(etag)
+        return json_response(body, headers={'ETag': etag})
+
+    async with read_session() as session:
+        user = await user_for_subject(session, subject)
+        query = _filter_to_dos(
+            select(ToDo).where(ToDo.user_id == user.id), title, description, state, q
+        )
+        filtered = query
+
+        if q:
+            if cursor:
+                raise HTTPException(
+                    status_code=HTTPStatus.BAD_REQUEST,
+                    detail='Cursor pagination is not available for ranked search.',
+                )
+
+            rank = func.ts_rank(
+                todo_search_vector(ToDo.title, ToDo.description), todo_search_query(q)
+            )
+            query = query.order_by(rank.desc(), ToDo.id)
+        else:
+            query = query.order_by(ToDo.id)
+
+        # keyset mode: seek past the last id instead of skipping ``offset`` rows
+        if cursor:
+            query = query.where(ToDo.id > decode_cursor(cursor, 'id')['id'])
+        else:
+            query = query.offset(offset)
+
+        query = query.limit(limit)
+        totals = await _count_to_dos(session, user, total, filtered, filters)
+
+        if if_none_match:
+            # validate against the page's (id, updated_at) keys only
+            keys = (
+                await session.execute(query.with_only_columns(ToDo.id, ToDo.updated_at))
+            ).all()
+            etag = _page_etag(user, offset, limit, q, keys, totals)
+            if etag_matches(if_none_match, etag, weak=True):
+                return not_modified(etag)
+
+        to_dos = (await session.scalars(query)).all()
+
+        next_cursor = None
+        if not q and to_dos and len(to_dos) == limit:
+            next_cursor = encode_cursor(id=to_dos[-1].id)
+
+        page = {
+            'result': to_dos,
+            'offset': offset,
+            'limit': limit,
+            'next_cursor': next_cursor,
+            **totals,
+        }
+        if settings.FAST_SERIALIZATION:
+            body = dumps({**page, 'result': rows_to_dicts(to_dos, ToDoPublicSchema)})
+        else:
+            body = ToDoPage.model_validate(page, from_attributes=True).model_dump_json()
+            body = body.encode()
+
+        etag = _page_etag(user, offset, limit, q, to_dos, totals)
+        await response_cache.set(cache_key, etag, body)
+
+        return json_response(body, headers={'ETag': etag})
+
+
+EXPORT_COLUMNS = ('id', 'title', 'description', 'state', 'created_at', 'updated_at')
+
+
+def _export_values(row):
+    return (
+        row.id,
+        row.title,
+        row.description,
+        row.state.value,
+        row.created_at.isoformat(),
+        row.updated_at.isoformat(),
+    )
+
+
+def _ndjson_lines(rows):
+    return ''.join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _export_values(row)))) + '\n' for row in rows
     )
 
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(_export_values(row) for row in rows)
+    return buffer.getvalue()
+
+
+@router.get('/export')
+async def export_to_dos(  # noqa: PLR0913 PLR0917
+    user: User,
+    session_scope: SessionScope,
+    title: str = None,
+    description: str = None,
+    state: ToDoState | None = None,
+    q: str | None = None,
+    export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+):
+    query = _filter_to_dos(
+        select(*(getattr(ToDo, column) for column in EXPORT_COLUMNS)).where(
+            ToDo.user_id == user.id
+        ),
+        title,
+        description,
+        state,
+        q,
+    ).order_by(ToDo.id)
+    batch_size = settings.TODO_EXPORT_BATCH_SIZE
+
+    async def content():
+        if export_format == 'csv':
+            yield ','.join(EXPORT_COLUMNS) + '\r\n'
+
+        encode = _csv_lines if export_format == 'csv' else _ndjson_lines
+
+        # server-side cursor: at most one batch of rows is held in memory
+        async with session_scope() as session:
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions(batch_size):
+                yield encode(rows)
+
+    if export_format == 'csv':
+        return StreamingResponse(
+            content(),
+            media_type='text/csv',
+            headers={'Content-Disposition': 'attachment; filename="todos.csv"'},
+        )
+
+    return StreamingResponse(content(), media_type='application/x-ndjson')
+
+
+@router.get('/stats', response_model=ToDoStatsSchema)
+async def get_to_do_stats(session: ReadSession, user: Reader):
+    # one row per state, maintained by the todo triggers
+    counts = dict.fromkeys(ToDoState, 0) | dict(
+        (
+            await session.execute(
+                select(ToDoStateCount.state, ToDoStateCount.count).where(
+                    ToDoStateCount.user_id == user.id
+                )
+            )
+        ).all()
+    )
+
+    return {'counts': counts, 'total': sum(counts.values())}
+
+
+@router.get('/{todo_id}', response_model=ToDoPublicSchema)
+async def get_to_do(
+    todo_id: int,
+    session: ReadSession,
+    user: Reader,
+    response: Response,
+    if_none_match: str | None = Header(None),
+):
+    query = select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
+
+    if if_none_match:
+        key = (
+            await session.execute(query.with_only_columns(ToDo.id, ToDo.updated_at))
+        ).first()
+        if key and etag_matches(if_none_match, _to_do_etag(key), weak=True):
+            return not_modified(_to_do_etag(key))
+
+    to_do_db = await session.scalar(query)
+
     if not to_do_db:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='ToDo not found.')
 
+    response.headers['ETag'] = _to_do_etag(to_do_db)
+
     return to_do_db
 
 
 @router.patch('/{todo_id}', response_model=ToDoPublicSchema)
-def edit_to_do(
+async def edit_to_do(  # noqa: PLR0913 PLR0917
     todo_id: int,
     to_do: TodoUpdateSchema,
     session: Session,
     user: User,
+    response: Response,
+    if_match: str | None = Header(None),
 ):
-    to_do_db = session.scalar(
-        select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
-    )
+    query = select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
+
+    if if_match:
+        # hold the row so the precondition still holds when we write
+        query = query.with_for_update()
+
+    to_do_db = await session.scalar(query)
 
     if not to_do_db:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='ToDo not found.')
 
+    if if_match and not etag_matches(if_match, _to_do_etag(to_do_db)):
+        raise HTTPException(
+            status_code=HTTPStatus.PRECONDITION_FAILED,
+            detail='ToDo has been modified.',
+        )
+
     for field, value in to_do.model_dump(exclude_unset=True).items():
         setattr(to_do_db, field, value)
 
     session.add(to_do_db)
-    session.commit()
-    session.refresh(to_do_db)
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
+    await session.refresh(to_do_db)
+
+    response.headers['ETag'] = _to_do_etag(to_do_db)
 
     return to_do_db
 
 
 @router.delete('/{todo_id}', response_model=Message)
-def delete_todo(todo_id: int, session: Session, user: User):
-    to_do_db = session.scalar(
+async def delete_todo(todo_id: int, session: Session, user: User):
+    to_do_db = await session.scalar(
         select(ToDo).where(ToDo.user_id == user.id, ToDo.id == todo_id)
     )
 
     if not to_do_db:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='ToDo not found.')
 
-    session.delete(to_do_db)
-    session.commit()
+    await session.delete(to_do_db)
+    scope = _cache_scope(user.email)
+    await session.commit()
+    await response_cache.invalidate(scope)
 
     return {'message': 'ToDo has been deleted.'}
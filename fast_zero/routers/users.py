@@ -1,27 +1,40 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
+from fast_zero.database import (
+    get_read_session,
+    get_session,
+    record_writer,
+    release_connection,
+)
+from fast_zero.etag import etag_matches, make_etag, not_modified
 from fast_zero.models import User
+from fast_zero.pagination import decode_cursor, encode_cursor
+from fast_zero.routers.todo import invalidate_to_do_pages
 from fast_zero.schemas import UserListSchema, UserPublicSchema, UserSchema
-from fast_zero.security import get_current_user, get_password_hash
+from fast_zero.security import get_current_user, invalidate_user, password_hasher
+from fast_zero.serialization import dumps, json_response, rows_to_dicts
+from fast_zero.settings import get_settings
+
+settings = get_settings()
 
 router = APIRouter(
     prefix='/users',
     tags=['users'],
 )
 
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
 @router.post('/', response_model=UserPublicSchema, status_code=HTTPStatus.CREATED)
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
+async def create_user(user: UserSchema, session: T_Session):
+    db_user = await session.scalar(
         select(User).where((User.username == user.username) | (User.email == user.email))
     )
 
@@ -37,32 +50,74 @@ def create_user(user: UserSchema, session: T_Session):
                 detail='Email already exists',
             )
 
+    # not holding a pooled connection while waiting for argon2
+    await release_connection(session)
     db_user = User(
         username=user.username,
         email=user.email,
-        password=get_password_hash(user.password),
+        password=await password_hasher.hash(user.password),
     )
 
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
 
     return db_user
 
 
 @router.get('/', response_model=UserListSchema)
-def list_users(
-    session: T_Session,
+async def list_users(
+    session: T_ReadSession,
     limit: int = 10,
     skip: int = 0,
+    cursor: str | None = None,
 ):
-    users = session.scalars(select(User).limit(limit).offset(skip))
-    return {'users': users}
+    # only the public columns: never load the password hash to drop it again
+    query = select(User.id, User.username, User.email).order_by(User.id)
+
+    if cursor:
+        query = query.where(User.id > decode_cursor(cursor, 'id')['id'])
+    else:
+        query = query.offset(skip)
+
+    users = (await session.execute(query.limit(limit))).all()
+
+    next_cursor = None
+    if users and len(users) == limit:
+        next_cursor = encode_cursor(id=users[-1].id)
+
+    if settings.FAST_SERIALIZATION:
+        return json_response(
+            dumps({
+                'users': rows_to_dicts(users, UserPublicSchema),
+                'next_cursor': next_cursor,
+            })
+        )
+
+    return {'users': users, 'next_cursor': next_cursor}
+
+
+def _user_etag(user) -> str:
+    return make_etag(user.id, user.updated_at.isoformat())
 
 
 @router.get('/{user_id}', response_model=UserPublicSchema)
-def get_user(user_id: int, session: T_Session):
-    user_db = session.scalar(select(User).where(User.id == user_id))
+async def get_user(
+    user_id: int,
+    session: T_ReadSession,
+    response: Response,
+    if_none_match: str | None = Header(None),
+):
+    if if_none_match:
+        key = (
+            await session.execute(
+                select(User.id, User.updated_at).where(User.id == user_id)
+            )
+        ).first()
+        if key and etag_matches(if_none_match, _user_etag(key), weak=True):
+            return not_modified(_user_etag(key))
+
+    user_db = await session.scalar(select(User).where(User.id == user_id))
 
     if not user_db:
         raise HTTPException(
@@ -70,11 +125,13 @@ def get_user(user_id: int, session: T_Session):
             detail='User not found',
         )
 
+    response.headers['ETag'] = _user_etag(user_db)
+
     return user_db
 
 
 @router.put('/{user_id}', response_model=UserPublicSchema)
-def update_user(
+async def update_user(
     user_id: int,
     user_schema: UserSchema,
     session: T_Session,
@@ -86,18 +143,24 @@ def update_user(
             detail='Not enough permission',
         )
 
+    await release_connection(session)
+    previous_email = current_user.email
     current_user.username = user_schema.username
     current_user.email = user_schema.email
-    current_user.password = get_password_hash(user_schema.password)
+    current_user.password = await password_hasher.hash(user_schema.password)
 
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    await invalidate_user(previous_email, user_schema.email)
+    await invalidate_to_do_pages(previous_email, user_schema.email)
+    # the e-mail is the token subject: the next token has the new one
+    await record_writer(previous_email, user_schema.email)
+    await session.refresh(current_user)
 
     return current_user
 
 
 @router.delete('/{user_id}')
-def delete_user(
+async def delete_user(
     user_id: int,
     session: T_Session,
     current_user: T_CurrentUser,
@@ -108,7 +171,10 @@ def delete_user(
             detail='Not enough permission',
         )
 
-    session.delete(current_user)
-    session.commit()
+    email = current_user.email
+    await session.delete(current_user)
+    await session.commit()
+    await invalidate_user(email)
+    await invalidate_to_do_pages(email)
 
     return {'message': 'User deleted'}
@@ -1,9 +1,10 @@
 from datetime import datetime
-from typing import Generic, List, Optional, TypeVar
+from typing import Annotated, Generic, List, Literal, Optional, TypeVar
 
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, model_validator
 
 from fast_zero.models import ToDoState
+from fast_zero.settings import get_settings
 
 SchemaType = TypeVar('SchemaType', bound=BaseModel)
 
@@ -12,12 +13,40 @@ class PaginationBase(BaseModel, Generic[SchemaType]):
     result: Optional[List[SchemaType]] = None
     offset: int = 0
     limit: int = 10
+    next_cursor: Optional[str] = None
+    # set when a total is requested: exact ('eq'), capped ('gte') or estimated
+    total: Optional[int] = None
+    total_relation: Optional[Literal['eq', 'gte', 'approx']] = None
 
 
 class Message(BaseModel):
     message: str
 
 
+class PoolStatsSchema(BaseModel):
+    pool: str
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    wait_count: int
+    wait_total_seconds: float
+    wait_max_seconds: float
+
+
+class CacheStatsSchema(BaseModel):
+    size: Optional[int]
+    maxsize: Optional[int]
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class ReadinessSchema(BaseModel):
+    ready: bool
+    warmup_seconds: Optional[float]
+
+
 class UserSchema(BaseModel):
     username: str
     email: EmailStr
@@ -37,6 +66,7 @@ class UserPublicSchema(BaseModel):
 
 class UserListSchema(BaseModel):
     users: list[UserPublicSchema]
+    next_cursor: Optional[str] = None
 
 
 class TokenSchema(BaseModel):
@@ -54,13 +84,59 @@ class ToDoSchema(BaseModel):
     state: ToDoState
 
 
+# checked while the body is validated: items past it are never looked at
+BULK_MAX_ITEMS = get_settings().TODO_BULK_MAX_ITEMS
+
+ToDoBulkCreateSchema = Annotated[list[ToDoSchema], Field(max_length=BULK_MAX_ITEMS)]
+
+
 class ToDoPublicSchema(ToDoSchema):
     id: int
     created_at: datetime
     updated_at: datetime
 
 
+class ToDoStatsSchema(BaseModel):
+    counts: dict[ToDoState, int]
+    total: int
+
+
+class ToDoBulkSchema(BaseModel):
+    result: list[ToDoPublicSchema]
+
+
 class TodoUpdateSchema(BaseModel):
     title: str | None = None
     description: str | None = None
     state: ToDoState | None = None
+
+
+class ToDoSelectionSchema(BaseModel):
+    ids: list[int] | None = Field(default=None, max_length=BULK_MAX_ITEMS)
+    state: ToDoState | None = None
+    title: str | None = None
+
+    @model_validator(mode='after')
+    def check_selector(self):
+        if self.ids is None and self.state is None and not self.title:
+            raise ValueError('Select todos by ids, state or title.')
+        return self
+
+
+class ToDoBulkUpdateSchema(ToDoSelectionSchema):
+    changes: TodoUpdateSchema
+
+
+class ToDoBulkDeleteSchema(BaseModel):
+    ids: list[int]
+
+
+class ToDoImportErrorSchema(BaseModel):
+    line: int
+    detail: str
+
+
+class ToDoImportSchema(BaseModel):
+    imported: int
+    rejected: int
+    errors: list[ToDoImportErrorSchema]
@@ -1,24 +1,107 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
+from hmac import compare_digest
 from http import HTTPStatus
+from multiprocessing import get_context
 
-from fastapi import Depends, HTTPException
+from fastapi import Depends, Header, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import decode, encode
 from jwt.exceptions import ExpiredSignatureError, PyJWTError
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from starlette.concurrency import run_in_threadpool
 from zoneinfo import ZoneInfo
 
-from fast_zero.database import get_session
+from fast_zero.cache import response_cache_backend
+from fast_zero.database import get_read_session, get_session
+from fast_zero.metrics import registry
 from fast_zero.models import User
 from fast_zero.schemas import TokenDataSchema
-from fast_zero.settings import Settings
+from fast_zero.settings import get_settings
 
-settings = Settings()
+settings = get_settings()
 
-pwd_context = PasswordHash.recommended()
+pwd_context = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
+password_hash_seconds = registry.histogram(
+    'password_hash_duration_seconds',
+    'Argon2 hash and verify time, including the wait for a worker.',
+    ('operation',),
+)
+
+
+class UserCache:
+    """Resolved users by token subject, in a response cache backend.
+
+    Entries hold the user's columns and come back as detached instances,
+    merged into the request session without a query. Invalidating bumps
+    the subject's generation, which is part of the key, so it reaches every
+    worker sharing the backend.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    async def generation(self, subject: str) -> int | None:
+        if self.backend is None:
+            return None
+
+        return await self.backend.generation(f'user:{subject}')
+
+    async def get(self, subject: str, generation: int | None) -> User | None:
+        if generation is None:
+            return None
+
+        value = await self.backend.get(f'user:{subject}:{generation}')
+        return None if value is None else _load_user(value)
+
+    async def set(self, subject: str, generation: int | None, user: User):
+        """Store ``user``, read at ``generation``, unless it was invalidated since.
+
+        A lookup that raced ``invalidate`` (a password change, a deletion)
+        would otherwise keep the stale copy valid until it expires.
+        """
+        if generation is None or await self.generation(subject) != generation:
+            return
+
+        await self.backend.set(f'user:{subject}:{generation}', _dump_user(user))
+
+    async def invalidate(self, subject: str):
+        if self.backend is not None:
+            await self.backend.bump(f'user:{subject}')
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> dict:
+        if self.backend is None:
+            return {'size': 0, 'maxsize': 0, 'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+
+        return self.backend.stats()
+
+
+user_cache = UserCache(
+    response_cache_backend(
+        settings.USER_CACHE_BACKEND,
+        settings.USER_CACHE_URL,
+        settings.USER_CACHE_SIZE,
+        settings.USER_CACHE_TTL,
+    )
+)
 
 
 def create_access_token(data: dict):
@@ -39,31 +122,175 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    def credentials_exception(detail: str = 'Could not validate credentials'):
-        return HTTPException(
+class PasswordHasherPool:
+    """Runs argon2 hashing and verification in a dedicated process pool.
+
+    At most ``max_pending`` calls may be queued or running at once; past that
+    a call is rejected immediately with 503 instead of queueing behind a
+    login storm. With ``workers`` set to 0 the calls run on the thread pool.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+        os.register_at_fork(after_in_child=self._forget_executor)
+
+    def _forget_executor(self):
+        # the executor's queue threads do not survive a fork
+        self.pending = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and holds
+            # pooled DB sockets is not safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=get_context('spawn')
+            )
+        return self._executor
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Too many concurrent password operations',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(fn, *args)
+
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        with password_hash_seconds.time(('hash',)):
+            return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        with password_hash_seconds.time(('verify',)):
+            return await self.run(verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+password_hasher = PasswordHasherPool(
+    settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
+def _dump_user(user: User) -> bytes:
+    return json.dumps({
+        'id': user.id,
+        'username': user.username,
+        'password': user.password,
+        'email': user.email,
+        'created_at': user.created_at.isoformat(),
+        'updated_at': user.updated_at.isoformat(),
+    }).encode()
+
+
+def _load_user(value: bytes) -> User:
+    fields = json.loads(value)
+    user = User(
+        username=fields['username'], password=fields['password'], email=fields['email']
+    )
+    user.id = fields['id']
+    user.created_at = datetime.fromisoformat(fields['created_at'])
+    user.updated_at = datetime.fromisoformat(fields['updated_at'])
+    make_transient_to_detached(user)
+    return user
+
+
+async def invalidate_user(*emails: str):
+    for email in emails:
+        await user_cache.invalidate(email)
+
+
+def require_diagnostics_token(authorization: str | None = Header(default=None)):
+    """Guards the pool, cache and metrics endpoints.
+
+    They answer 404 unless ``DIAGNOSTICS_TOKEN`` is set, and then want it as
+    a bearer token, e.g. from the Prometheus scrape config.
+    """
+    if not settings.DIAGNOSTICS_TOKEN:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail='Not Found')
+
+    expected = f'Bearer {settings.DIAGNOSTICS_TOKEN}'
+    if not compare_digest((authorization or '').encode(), expected.encode()):
+        raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
-            detail=detail,
+            detail='Invalid diagnostics token',
             headers={'WWW-Authenticate': 'Bearer'},
         )
 
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    return await user_for_subject(session, _verified_subject(token))
+
+
+async def get_current_reader(
+    session: AsyncSession = Depends(get_read_session),
+    token: str = Depends(oauth2_scheme),
+):
+    """``get_current_user`` for read-only routes, looked up on a replica."""
+    return await user_for_subject(session, _verified_subject(token))
+
+
+def get_token_subject(token: str = Depends(oauth2_scheme)) -> str:
+    """The subject (e-mail) of a valid token, without loading the user."""
+    return _verified_subject(token)
+
+
+def _credentials_exception(detail: str = 'Could not validate credentials'):
+    return HTTPException(
+        status_code=HTTPStatus.UNAUTHORIZED,
+        detail=detail,
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
+
+
+def _verified_subject(token: str) -> str:
     try:
         payload = decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username = payload.get('sub')
         if not username:
-            raise credentials_exception()
+            raise _credentials_exception()
         token_data = TokenDataSchema(username=username)
     except ExpiredSignatureError:
-        raise credentials_exception(detail='Token has expired')
+        raise _credentials_exception(detail='Token has expired')
     except PyJWTError:
-        raise credentials_exception()
+        raise _credentials_exception()
+
+    return token_data.username
+
 
-    user_db = session.scalar(select(User).where(User.email == token_data.username))
+async def user_for_subject(session, subject: str) -> User:
+    generation = await user_cache.generation(subject)
+    cached_user = await user_cache.get(subject, generation)
+
+    if cached_user is not None:
+        return await session.merge(cached_user, load=False)
+
+    user_db = await session.scalar(select(User).where(User.email == subject))
 
     if user_db is None:
-        raise credentials_exception()
+        raise _credentials_exception()
+
+    await user_cache.set(subject, generation, user_db)
 
     return user_db
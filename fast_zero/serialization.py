@@ -0,0 +1,33 @@
+"""Response bodies built straight from trusted database rows.
+
+Rows read from our own tables already satisfy the public schemas, so the
+fast path skips re-validating them on the way out and encodes plain dicts
+with orjson. The bytes match what the ``response_model`` path produces.
+"""
+
+from functools import cache
+from operator import attrgetter
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+@cache
+def _getter(schema: type[BaseModel]):
+    fields = tuple(schema.model_fields)
+    values = attrgetter(*fields)
+    return lambda row: dict(zip(fields, values(row)))
+
+
+def rows_to_dicts(rows, schema: type[BaseModel]) -> list[dict]:
+    """The ``schema`` fields of each row, without validating them."""
+    return list(map(_getter(schema), rows))
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content)
+
+
+def json_response(body: bytes, headers: dict | None = None) -> Response:
+    return Response(body, media_type='application/json', headers=headers)
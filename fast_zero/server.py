@@ -0,0 +1,119 @@
+"""Production server, one uvicorn worker process per available CPU::
+
+    python -m fast_zero.server [--workers N] [--host HOST] [--port PORT]
+
+Workers are spawned, not forked, so each one imports the app and builds
+its own engine and pool. On SIGTERM every worker stops accepting
+connections, lets in-flight requests finish for up to
+``SERVER_GRACEFUL_TIMEOUT`` seconds and then closes its pooled
+connections in the app's lifespan shutdown.
+
+State kept in process memory is per worker:
+
+* a ``memory`` user or response cache is invalidated only in the worker
+  that handled the write, so with more than one worker it is turned off,
+  with a warning; the ``redis`` backend is shared by all of them;
+* with read replicas, the users who just wrote must be seen by every
+  worker, so ``DATABASE_READ_YOUR_WRITES_BACKEND=redis`` is required;
+* ``/metrics`` is answered by whichever worker accepts the scrape, with
+  that worker's own counters. Nothing sums them up: for exact numbers run
+  ``SERVER_WORKERS=1`` per container and scrape every container, otherwise
+  treat each scrape as a sample of one worker (counters may step back
+  between scrapes, which ``rate()`` takes for a reset).
+"""
+
+import argparse
+import logging
+import math
+import os
+from pathlib import Path
+
+import uvicorn
+
+from fast_zero.settings import Settings, get_settings
+
+CGROUP_CPU_MAX = Path('/sys/fs/cgroup/cpu.max')
+
+log = logging.getLogger('fast_zero.server')
+
+
+def available_cpus(cpu_max: Path = CGROUP_CPU_MAX) -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup quota.
+
+    ``os.cpu_count()`` reports the host's CPUs, also inside a container
+    limited to a fraction of them.
+    """
+    cpus = len(os.sched_getaffinity(0))
+
+    try:
+        quota, period = cpu_max.read_text().split()
+    except (OSError, ValueError):
+        return cpus
+
+    if quota == 'max':
+        return cpus
+
+    return max(min(cpus, math.ceil(int(quota) / int(period))), 1)
+
+
+def worker_count(settings: Settings) -> int:
+    return settings.SERVER_WORKERS or available_cpus()
+
+
+def per_worker_overrides(settings: Settings, workers: int) -> dict[str, str]:
+    """Settings that turn off the caches ``workers`` processes cannot share."""
+    if workers <= 1:
+        return {}
+
+    overrides = {}
+    if settings.USER_CACHE_BACKEND == 'memory':
+        overrides['USER_CACHE_BACKEND'] = 'none'
+    if settings.TODO_CACHE_BACKEND == 'memory':
+        overrides['TODO_CACHE_BACKEND'] = 'none'
+
+    return overrides
+
+
+def main(argv=None):
+    settings = get_settings()
+
+    parser = argparse.ArgumentParser(description='Run the API with uvicorn.')
+    parser.add_argument('--workers', type=int, default=worker_count(settings))
+    parser.add_argument('--host', default=settings.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=settings.SERVER_PORT)
+    args = parser.parse_args(argv)
+
+    if (
+        args.workers > 1
+        and settings.DATABASE_REPLICA_URLS
+        and settings.DATABASE_READ_YOUR_WRITES_BACKEND == 'memory'
+    ):
+        parser.error(
+            'read replicas with more than one worker need '
+            'DATABASE_READ_YOUR_WRITES_BACKEND=redis'
+        )
+
+    overrides = per_worker_overrides(settings, args.workers)
+    for name in overrides:
+        log.warning(
+            '%s=memory is per worker: caching is off with %d workers, '
+            'set %s=redis to keep it',
+            name,
+            args.workers,
+            name,
+        )
+    # spawned workers read their settings from this environment
+    os.environ.update(overrides)
+
+    uvicorn.run(
+        'fast_zero.app:app',
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+
+
+if __name__ == '__main__':
+    main()
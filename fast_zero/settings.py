@@ -1,3 +1,6 @@
+from functools import cache
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -7,6 +10,53 @@ class Settings(BaseSettings):
     )
 
     DATABASE_URL: str
+    DATABASE_ASYNC: bool = False
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_POOL_USE_LIFO: bool = False
+    DATABASE_NULL_POOL: bool = False
+    DATABASE_SLOW_QUERY_MS: float = 250
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_RETRY_SECONDS: float = 10
+    DATABASE_READ_YOUR_WRITES_SECONDS: float = 5
+    DATABASE_READ_YOUR_WRITES_SIZE: int = 10000
+    DATABASE_READ_YOUR_WRITES_BACKEND: Literal['memory', 'redis'] = 'memory'
+    DATABASE_READ_YOUR_WRITES_URL: str = 'redis://localhost:6379/0'
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+    DIAGNOSTICS_TOKEN: str | None = None
+    USER_CACHE_BACKEND: Literal['none', 'memory', 'redis'] = 'memory'
+    USER_CACHE_URL: str = 'redis://localhost:6379/0'
+    USER_CACHE_SIZE: int = 1024
+    USER_CACHE_TTL: float = 60
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 32
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    TODO_BULK_MAX_ITEMS: int = 1000
+    TODO_EXPORT_BATCH_SIZE: int = 1000
+    TODO_IMPORT_CHUNK_SIZE: int = 5000
+    TODO_IMPORT_MAX_ERRORS: int = 100
+    TODO_CACHE_BACKEND: Literal['none', 'memory', 'redis'] = 'none'
+    TODO_CACHE_URL: str = 'redis://localhost:6379/0'
+    TODO_CACHE_SIZE: int = 4096
+    TODO_CACHE_TTL: float = 30
+    TODO_COUNT_CAP: int = 1000
+    FAST_SERIALIZATION: bool = False
+    SERVER_HOST: str = '0.0.0.0'  # noqa: S104
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0  # 0: one per available CPU
+    SERVER_GRACEFUL_TIMEOUT: float = 30
+    WARMUP_ENABLED: bool = True
+    WARMUP_CONNECTIONS: int = 2
+
+
+@cache
+def get_settings() -> Settings:
+    """The settings every module shares, read from the environment once."""
+    return Settings()
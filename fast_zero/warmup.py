@@ -0,0 +1,182 @@
+"""Startup warmup, run by the app's lifespan before it takes traffic.
+
+Everything here would otherwise happen on the first live requests of each
+worker: opening pool connections, compiling the hot statements (and, with
+psycopg, preparing them server side), starting the password hasher's
+processes and the first pass through the response serializers.
+"""
+
+import asyncio
+import logging
+from contextlib import AsyncExitStack, ExitStack
+from datetime import datetime
+from time import perf_counter
+
+from sqlalchemy import select
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from fast_zero.metrics import registry
+from fast_zero.models import ToDo, ToDoState, ToDoStateCount, User
+from fast_zero.routers.todo import ToDoPage, _filter_to_dos
+from fast_zero.schemas import ToDoPublicSchema, UserListSchema, UserPublicSchema
+from fast_zero.security import get_password_hash, password_hasher
+from fast_zero.serialization import dumps, rows_to_dicts
+
+log = logging.getLogger('fast_zero.warmup')
+
+warmup_seconds = registry.gauge('app_warmup_seconds', 'Duration of the startup warmup.')
+app_ready = registry.gauge('app_ready', '1 once the startup warmup has finished.')
+app_ready.set(0)
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.seconds = None
+
+    def finish(self, seconds: float):
+        self.ready = True
+        self.seconds = seconds
+        warmup_seconds.set(seconds)
+        app_ready.set(1)
+
+
+warmup_state = WarmupState()
+
+
+def hot_statements() -> list:
+    """The statements of the busiest routes, built as the routes build them.
+
+    Compiled SQL is cached by statement structure, not by parameter values,
+    so running these with placeholder ids fills the cache the routes hit.
+    """
+    to_dos = select(ToDo).where(ToDo.user_id == 0)
+    return [
+        # get_current_user and login
+        select(User).where(User.email == 'warmup'),
+        # GET /todo/ with the default filters and pagination
+        _filter_to_dos(to_dos, None, None, None, None)
+        .order_by(ToDo.id)
+        .offset(0)
+        .limit(10),
+        # GET, PATCH and DELETE /todo/{id}
+        select(ToDo).where(ToDo.user_id == 0, ToDo.id == 0),
+        # GET /todo/stats
+        select(ToDoStateCount.state, ToDoStateCount.count).where(
+            ToDoStateCount.user_id == 0
+        ),
+    ]
+
+
+def _warm_connection(connection):
+    # with prepare_threshold at 0 psycopg prepares each statement on its
+    # first run; None means preparing is off (NullPool) and stays off
+    driver = connection.connection.driver_connection
+    threshold = getattr(driver, 'prepare_threshold', None)
+    if threshold is not None:
+        driver.prepare_threshold = 0
+
+    try:
+        for statement in hot_statements():
+            connection.execute(statement).all()
+    finally:
+        if threshold is not None:
+            driver.prepare_threshold = threshold
+        connection.rollback()
+
+
+def _connection_count(engine, connections: int) -> int:
+    """At least one, and no more than the pool keeps once they are returned."""
+    pool = getattr(engine, 'sync_engine', engine).pool
+    if isinstance(pool, QueuePool):
+        connections = min(connections, pool.size())
+
+    return max(connections, 1)
+
+
+def _warm_pool_sync(engine, connections: int):
+    # every connection is held until all are open, or the pool would hand
+    # the same one out again
+    with ExitStack() as stack:
+        for _ in range(connections):
+            _warm_connection(stack.enter_context(engine.connect()))
+
+
+async def warm_pool(engine, connections: int):
+    connections = _connection_count(engine, connections)
+
+    if not hasattr(engine, 'sync_engine'):
+        await run_in_threadpool(_warm_pool_sync, engine, connections)
+        return
+
+    async with AsyncExitStack() as stack:
+        for _ in range(connections):
+            connection = await stack.enter_async_context(engine.connect())
+            await connection.run_sync(_warm_connection)
+
+
+async def warm_password_hasher():
+    # one call per worker process, so all of them are started
+    await asyncio.gather(
+        *(
+            password_hasher.run(get_password_hash, 'warmup')
+            for _ in range(max(password_hasher.workers, 1))
+        )
+    )
+
+
+def warm_serializers():
+    to_do = ToDo(title='warmup', description='', state=ToDoState.draft, user_id=0)
+    to_do.id = 0
+    to_do.created_at = to_do.updated_at = datetime.now()
+    page = {
+        'result': [to_do],
+        'offset': 0,
+        'limit': 1,
+        'next_cursor': None,
+        'total': None,
+        'total_relation': None,
+    }
+
+    ToDoPage.model_validate(page, from_attributes=True).model_dump_json()
+    dumps({**page, 'result': rows_to_dicts([to_do], ToDoPublicSchema)})
+
+    user = User(username='warmup', password='', email='warmup@example.com')
+    user.id = 0
+    UserListSchema.model_validate(
+        {'users': [user], 'next_cursor': None}, from_attributes=True
+    ).model_dump_json()
+    dumps({'users': rows_to_dicts([user], UserPublicSchema), 'next_cursor': None})
+
+
+async def warm_up(
+    engine,
+    connections: int,
+    state: WarmupState = warmup_state,
+    replicas=(),
+):
+    """Run every warmup step, then mark ``state`` ready.
+
+    A failing step is logged and skipped: a database that is down at boot
+    must not keep the worker from starting once it is back.
+    """
+    start = perf_counter()
+
+    steps = [
+        ('pool', warm_pool(engine, connections)),
+        *(
+            (f'replica {n} pool', warm_pool(replica, connections))
+            for n, replica in enumerate(replicas)
+        ),
+        ('password hasher', warm_password_hasher()),
+        ('serializers', run_in_threadpool(warm_serializers)),
+    ]
+    for name, step in steps:
+        try:
+            await step
+        except Exception:
+            log.exception('warmup of the %s failed', name)
+
+    state.finish(perf_counter() - start)
+    log.info('warmup finished in %.3fs', state.seconds)
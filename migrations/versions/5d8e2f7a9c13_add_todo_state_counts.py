@@ -0,0 +1,94 @@
+"""add todo state counts
+
+Revision ID: 5d8e2f7a9c13
+Revises: 7c4e1b8d2a96
+Create Date: 2026-10-18 14:05:37.218904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e2f7a9c13'
+down_revision: Union[str, None] = '7c4e1b8d2a96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# A frozen copy of the trigger DDL as of this revision: later changes to
+# fast_zero.models must not alter what this migration runs.
+DELTAS = {
+    'insert': 'SELECT user_id, state, 1 AS delta FROM new_rows',
+    'update': (
+        'SELECT user_id, state, 1 AS delta FROM new_rows '
+        'UNION ALL SELECT user_id, state, -1 FROM old_rows'
+    ),
+    'delete': 'SELECT user_id, state, -1 AS delta FROM old_rows',
+}
+TRANSITIONS = {
+    'insert': 'NEW TABLE AS new_rows',
+    'update': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'delete': 'OLD TABLE AS old_rows',
+}
+FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_state_counts_{operation}() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock_shared(
+        hashtext('todo_state_counts'), user_id
+    )
+    FROM (SELECT DISTINCT user_id FROM ({deltas}) AS deltas ORDER BY 1) AS o;
+
+    INSERT INTO todo_state_counts AS counts (user_id, state, count)
+    SELECT user_id, state, sum(delta) FROM ({deltas}) AS deltas
+    GROUP BY user_id, state
+    HAVING sum(delta) <> 0
+    ORDER BY user_id, state
+    ON CONFLICT (user_id, state)
+    DO UPDATE SET count = counts.count + excluded.count;
+
+    RETURN NULL;
+END
+$$
+"""
+TRIGGER = """
+CREATE TRIGGER todo_state_counts_{operation}
+AFTER {event} ON todo
+REFERENCING {transition}
+FOR EACH STATEMENT EXECUTE FUNCTION todo_state_counts_{operation}()
+"""
+
+
+def upgrade() -> None:
+    op.create_table('todo_state_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', postgresql.ENUM('draft', 'todo', 'doing', 'done', 'trash', name='todostate', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+    # no writes may slip in between the backfill and the triggers
+    op.execute('LOCK TABLE todo IN SHARE MODE')
+    op.execute(
+        'INSERT INTO todo_state_counts (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todo GROUP BY user_id, state'
+    )
+    for operation, deltas in DELTAS.items():
+        op.execute(FUNCTION.format(operation=operation, deltas=deltas))
+        op.execute(
+            TRIGGER.format(
+                operation=operation,
+                event=operation.upper(),
+                transition=TRANSITIONS[operation],
+            )
+        )
+
+
+def downgrade() -> None:
+    for operation in DELTAS:
+        op.execute(f'DROP TRIGGER todo_state_counts_{operation} ON todo')
+        op.execute(f'DROP FUNCTION todo_state_counts_{operation}()')
+    op.drop_table('todo_state_counts')
@@ -0,0 +1,41 @@
+"""add todo search indexes
+
+Revision ID: 7c4e1b8d2a96
+Revises: 3f2a9c1d7b45
+Create Date: 2026-10-18 11:26:40.512877
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e1b8d2a96'
+down_revision: Union[str, None] = '3f2a9c1d7b45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_todo_title_trgm', 'todo', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.create_index('ix_todo_description_trgm', 'todo', ['description'], unique=False, postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'})
+    # must stay identical to models.todo_search_vector
+    op.create_index(
+        'ix_todo_search',
+        'todo',
+        [sa.text(
+            "(setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, description), 'B'))"
+        )],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todo_search', table_name='todo')
+    op.drop_index('ix_todo_description_trgm', table_name='todo')
+    op.drop_index('ix_todo_title_trgm', table_name='todo')
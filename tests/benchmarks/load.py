@@ -0,0 +1,147 @@
+"""HTTP load driver for the benchmark suite.
+
+Requests go through the ASGI app in-process with ``httpx``, against a
+database seeded at one of ``SCALES``. Results are written as JSON under
+``.benchmarks/load`` named after the current commit, so two commits can be
+compared::
+
+    git checkout main && task bench
+    git checkout my-branch && BENCH_BASELINE=<main commit> task bench
+
+With a baseline, the run fails when an endpoint's p95 grows by more than
+``BENCH_TOLERANCE`` (20% by default).
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+from statistics import quantiles
+
+from sqlalchemy import text
+
+from fast_zero.importer import copy_rows_sync
+from fast_zero.security import get_password_hash
+from tests.conftest import ToDoFactory, UserFactory
+
+SCALES = {'1k': 1_000, '100k': 100_000, '1m': 1_000_000}
+TODOS_PER_USER = 1_000
+PASSWORD = 'bench@123'
+RESULTS_DIR = Path('.benchmarks/load')
+COPY_CHUNK = 10_000
+
+
+def seed(session, todos: int) -> list[tuple[int, str]]:
+    """``(id, email)`` of users with ``TODOS_PER_USER`` todos each.
+
+    Every user's password is ``PASSWORD``. Todo texts are drawn from a pool
+    of factory-built rows: running the factories a million times would
+    dominate the setup.
+    """
+    password = get_password_hash(PASSWORD)
+    users = UserFactory.create_batch(max(todos // TODOS_PER_USER, 1), password=password)
+    session.add_all(users)
+    session.commit()
+
+    pool = [
+        (to_do.title, to_do.description, to_do.state.value)
+        for to_do in ToDoFactory.build_batch(TODOS_PER_USER)
+    ]
+    rows = (
+        (*values, users[n % len(users)].id)
+        for n, values in zip(range(todos), itertools.cycle(pool))
+    )
+    while chunk := list(itertools.islice(rows, COPY_CHUNK)):
+        copy_rows_sync(session, chunk)
+    session.commit()
+
+    session.execute(text('ANALYZE'))
+    session.commit()
+    return [(user.id, user.email) for user in users]
+
+
+def percentiles(samples: list[float]) -> dict:
+    cuts = quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50_ms': cuts[49] * 1000,
+        'p95_ms': cuts[94] * 1000,
+        'p99_ms': cuts[98] * 1000,
+    }
+
+
+async def drive(client, build, requests: int, concurrency: int) -> dict:
+    """Send ``build(n)`` requests, at most ``concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def call(n):
+        method, url, kwargs = build(n)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call(n) for n in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {'requests': requests, 'rps': requests / elapsed, **percentiles(latencies)}
+
+
+def commit_id() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'local'
+
+
+def save(results: dict, scale: str) -> Path:
+    RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+    path = RESULTS_DIR / f'{commit_id()}-{scale}.json'
+    path.write_text(json.dumps(results, indent=2))
+    return path
+
+
+def load_baseline(scale: str) -> dict | None:
+    baseline = os.environ.get('BENCH_BASELINE')
+    if not baseline:
+        return None
+
+    return json.loads((RESULTS_DIR / f'{baseline}-{scale}.json').read_text())
+
+
+def report(results: dict, baseline: dict | None) -> str:
+    lines = [f'{"endpoint":<28} {"req/s":>9} {"p50":>8} {"p95":>8} {"p99":>8}']
+    for endpoint, result in results.items():
+        line = (
+            f'{endpoint:<28} {result["rps"]:>9.0f} {result["p50_ms"]:>7.1f}ms '
+            f'{result["p95_ms"]:>7.1f}ms {result["p99_ms"]:>7.1f}ms'
+        )
+        if baseline and endpoint in baseline:
+            before = baseline[endpoint]
+            line += (
+                f'  rps {result["rps"] / before["rps"] - 1:+.0%}'
+                f' p95 {result["p95_ms"] / before["p95_ms"] - 1:+.0%}'
+            )
+        lines.append(line)
+
+    return '\n'.join(lines)
+
+
+def regressions(results: dict, baseline: dict | None, tolerance: float) -> list:
+    """Endpoints whose p95 grew by more than ``tolerance`` over the baseline."""
+    if not baseline:
+        return []
+
+    return [
+        endpoint
+        for endpoint, result in results.items()
+        if endpoint in baseline
+        and result['p95_ms'] > baseline[endpoint]['p95_ms'] * (1 + tolerance)
+    ]
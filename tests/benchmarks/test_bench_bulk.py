@@ -0,0 +1,31 @@
+import time
+
+import pytest
+
+ITEMS = 500
+
+
+def _payload(n):
+    return {'title': f'Import {n}', 'description': 'Imported', 'state': 'todo'}
+
+
+@pytest.mark.benchmark()
+def test_bench_bulk_vs_single_create(client, header_authorization):
+    start = time.perf_counter()
+    for n in range(ITEMS):
+        client.post('/todo/', headers=header_authorization, json=_payload(n))
+    single = ITEMS / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    response = client.post(
+        '/todo/bulk',
+        headers=header_authorization,
+        json=[_payload(n) for n in range(ITEMS)],
+    )
+    bulk = ITEMS / (time.perf_counter() - start)
+
+    print(
+        f'\ncreate {ITEMS} todos: single {single:.0f} items/s, '
+        f'bulk {bulk:.0f} items/s ({bulk / single:.1f}x)'
+    )
+    assert len(response.json()['result']) == ITEMS
@@ -0,0 +1,126 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fast_zero.app import app
+from fast_zero.database import (
+    get_read_session,
+    get_read_session_scope,
+    get_session,
+    get_session_scope,
+)
+from fast_zero.models import ToDo
+from fast_zero.security import create_access_token
+from tests.benchmarks import load
+
+# BENCH_SCALES=1k,100k,1m runs every scale; the larger ones take minutes to seed
+SCALES = os.environ.get('BENCH_SCALES', '1k').split(',')
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', '500'))
+# argon2 is slow on purpose, so logins and sign-ups get fewer requests
+HASHING_REQUESTS = max(REQUESTS // 10, 10)
+CONCURRENCY = int(os.environ.get('BENCH_CONCURRENCY', '20'))
+TOLERANCE = float(os.environ.get('BENCH_TOLERANCE', '0.2'))
+
+
+def _endpoints(users, to_do_ids, word):
+    email = users[0][1]
+    headers = {'Authorization': f'Bearer {create_access_token(data={"sub": email})}'}
+
+    def login(n):
+        data = {'username': users[n % len(users)][1], 'password': load.PASSWORD}
+        return 'POST', '/auth/token', {'data': data}
+
+    def sign_up(n):
+        data = {
+            'username': f'bench{n}',
+            'email': f'bench{n}@test.com',
+            'password': load.PASSWORD,
+        }
+        return 'POST', '/users/', {'json': data}
+
+    def create_to_do(n):
+        data = {'title': f'bench {n}', 'description': word, 'state': 'todo'}
+        return 'POST', '/todo/', {'headers': headers, 'json': data}
+
+    def edit_to_do(n):
+        data = {'state': 'doing' if n % 2 else 'done'}
+        url = f'/todo/{to_do_ids[n % len(to_do_ids)]}'
+        return 'PATCH', url, {'headers': headers, 'json': data}
+
+    def get(url):
+        return lambda n: ('GET', url(n), {'headers': headers})
+
+    return {
+        'POST /auth/token': (HASHING_REQUESTS, login),
+        'POST /auth/refresh_token': (
+            REQUESTS,
+            lambda n: ('POST', '/auth/refresh_token', {'headers': headers}),
+        ),
+        'GET /users/': (REQUESTS, get(lambda n: '/users/?limit=20')),
+        'GET /users/{id}': (
+            REQUESTS,
+            get(lambda n: f'/users/{users[n % len(users)][0]}'),
+        ),
+        'POST /users/': (HASHING_REQUESTS, sign_up),
+        'GET /todo/': (REQUESTS, get(lambda n: '/todo/?limit=20')),
+        'GET /todo/?state': (REQUESTS, get(lambda n: '/todo/?state=done&limit=20')),
+        'GET /todo/?title': (REQUESTS, get(lambda n: f'/todo/?title={word}&limit=20')),
+        'GET /todo/?q': (REQUESTS, get(lambda n: f'/todo/?q={word}&limit=20')),
+        'GET /todo/{id}': (
+            REQUESTS,
+            get(lambda n: f'/todo/{to_do_ids[n % len(to_do_ids)]}'),
+        ),
+        'GET /todo/stats': (REQUESTS, get(lambda n: '/todo/stats')),
+        'POST /todo/': (REQUESTS, create_to_do),
+        'PATCH /todo/{id}': (REQUESTS, edit_to_do),
+    }
+
+
+async def _run(engine, endpoints):
+    async_engine = create_async_engine(engine.url, pool_size=CONCURRENCY)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    async def get_session_override():
+        async with session_scope() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    app.dependency_overrides[get_session_scope] = lambda: session_scope
+    app.dependency_overrides[get_read_session_scope] = lambda: session_scope
+    transport = ASGITransport(app=app)
+    try:
+        async with AsyncClient(transport=transport, base_url='http://bench') as client:
+            return {
+                endpoint: await load.drive(client, build, requests, CONCURRENCY)
+                for endpoint, (requests, build) in endpoints.items()
+            }
+    finally:
+        app.dependency_overrides.clear()
+        await async_engine.dispose()
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize('scale', SCALES)
+def test_bench_load(session, engine, scale):
+    users = load.seed(session, load.SCALES[scale])
+    to_do_ids = session.scalars(
+        select(ToDo.id).where(ToDo.user_id == users[0][0]).limit(1000)
+    ).all()
+    word = session.scalar(select(ToDo.title).limit(1)).split()[0].strip('.')
+
+    results = asyncio.run(_run(engine, _endpoints(users, to_do_ids, word)))
+    baseline = load.load_baseline(scale)
+    path = load.save(results, scale)
+
+    print(f'\n{scale} todos, saved to {path}\n{load.report(results, baseline)}')
+    assert not load.regressions(results, baseline, TOLERANCE)
@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from jwt import decode, encode
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from fast_zero.security import create_access_token, settings
+from tests.benchmarks.load import percentiles
+
+PASSWORD = 'bench@123'
+HASH_ROUNDS = 20
+TOKEN_ROUNDS = 5000
+LOGIN_TARGET = 100
+# (time_cost, memory_cost KiB, parallelism); the last is the configured one
+ARGON2_COSTS = [
+    (2, 19456, 1),  # OWASP minimum
+    (1, 47104, 1),
+    (3, 65536, 4),  # pwdlib / argon2-cffi default
+    (
+        settings.ARGON2_TIME_COST,
+        settings.ARGON2_MEMORY_COST,
+        settings.ARGON2_PARALLELISM,
+    ),
+]
+JWT_ALGORITHMS = ['HS256', 'HS384', 'HS512', 'RS256', 'ES256', 'EdDSA']
+
+
+def _measure(fn, rounds: int) -> dict:
+    """Wall-clock latency and CPU time per call of ``fn``, on one thread."""
+    latencies = []
+    cpu_start = time.process_time()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    cpu = (time.process_time() - cpu_start) / rounds
+
+    return {
+        'ops': len(latencies) / sum(latencies),
+        'cpu_ms': cpu * 1000,
+        **percentiles(latencies),
+    }
+
+
+def _line(name: str, result: dict) -> str:
+    return (
+        f'{name:<32} {result["ops"]:>9.0f} ops/s  p50 {result["p50_ms"]:.3f}ms '
+        f'p99 {result["p99_ms"]:.3f}ms  cpu {result["cpu_ms"]:.3f}ms/op'
+    )
+
+
+def _keys(algorithm: str) -> tuple:
+    if algorithm.startswith('HS'):
+        return settings.SECRET_KEY, settings.SECRET_KEY
+
+    serialization = pytest.importorskip('cryptography.hazmat.primitives.serialization')
+    asymmetric = pytest.importorskip('cryptography.hazmat.primitives.asymmetric')
+    if algorithm == 'RS256':
+        private = asymmetric.rsa.generate_private_key(65537, 2048)
+    elif algorithm == 'ES256':
+        private = asymmetric.ec.generate_private_key(asymmetric.ec.SECP256R1())
+    else:
+        private = asymmetric.ed25519.Ed25519PrivateKey.generate()
+
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    return pem, private.public_key()
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize(('time_cost', 'memory_cost', 'parallelism'), ARGON2_COSTS)
+def test_bench_argon2(time_cost, memory_cost, parallelism):
+    context = PasswordHash((
+        Argon2Hasher(
+            time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+        ),
+    ))
+    hashed = context.hash(PASSWORD)
+
+    hashing = _measure(lambda: context.hash(PASSWORD), HASH_ROUNDS)
+    verifying = _measure(lambda: context.verify(PASSWORD, hashed), HASH_ROUNDS)
+
+    # a login is one verify; argon2 lanes may run on extra threads, so a
+    # core's capacity follows from CPU time rather than wall-clock latency
+    logins_per_core = 1000 / verifying['cpu_ms']
+    name = f'argon2 t={time_cost} m={memory_cost} p={parallelism}'
+    print(
+        f'\n{_line(f"{name} hash", hashing)}'
+        f'\n{_line(f"{name} verify", verifying)}'
+        f'\n{name}: {logins_per_core:.1f} logins/s per core, '
+        f'{logins_per_core * verifying["p50_ms"] / 1000:.1f} in flight per core, '
+        f'{LOGIN_TARGET / logins_per_core:.1f} cores for {LOGIN_TARGET} logins/s'
+    )
+    assert context.verify(PASSWORD, hashed)
+
+
+@pytest.mark.benchmark()
+@pytest.mark.parametrize('algorithm', JWT_ALGORITHMS)
+def test_bench_jwt(algorithm):
+    signing_key, verifying_key = _keys(algorithm)
+    payload = {'sub': 'bench@test.com', 'exp': 2**31}
+    token = encode(payload, signing_key, algorithm=algorithm)
+
+    encoding = _measure(
+        lambda: encode(payload, signing_key, algorithm=algorithm), TOKEN_ROUNDS
+    )
+    decoding = _measure(
+        lambda: decode(token, verifying_key, algorithms=[algorithm]), TOKEN_ROUNDS
+    )
+
+    print(
+        f'\n{_line(f"jwt {algorithm} encode", encoding)}'
+        f'\n{_line(f"jwt {algorithm} decode", decoding)}'
+    )
+    assert decode(token, verifying_key, algorithms=[algorithm]) == payload
+
+
+@pytest.mark.benchmark()
+def test_bench_access_token_round_trip():
+    """The configured create_access_token and the decode in get_current_user."""
+    token = create_access_token(data={'sub': 'bench@test.com'})
+
+    creating = _measure(
+        lambda: create_access_token(data={'sub': 'bench@test.com'}), TOKEN_ROUNDS
+    )
+    decoding = _measure(
+        lambda: decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]),
+        TOKEN_ROUNDS,
+    )
+
+    print(
+        f'\n{_line("create_access_token", creating)}'
+        f'\n{_line("get_current_user decode", decoding)}'
+    )
+    assert creating['ops'] > 0
@@ -0,0 +1,84 @@
+import time
+from collections import namedtuple
+
+import pytest
+from fastapi.responses import JSONResponse
+
+from fast_zero.routers import users
+from fast_zero.schemas import PaginationBase, ToDoPublicSchema, UserPublicSchema
+from fast_zero.serialization import dumps, json_response, rows_to_dicts
+from tests.test_serialization import _to_dos
+
+PAGE_SIZE = 100
+ROUNDS = 500
+
+UserRow = namedtuple('UserRow', 'id username email')
+
+
+def _per_page(render):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        render()
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+def _report(route, before, after):
+    print(
+        f'\n{route} ({PAGE_SIZE} rows): response_model {before:.0f} us/page, '
+        f'fast path {after:.0f} us/page ({before / after:.1f}x)'
+    )
+
+
+@pytest.mark.benchmark()
+def test_bench_list_to_dos_serialization():
+    page = {
+        'result': _to_dos(PAGE_SIZE),
+        'offset': 0,
+        'limit': PAGE_SIZE,
+        'next_cursor': None,
+        'total': None,
+        'total_relation': None,
+    }
+
+    def validated():
+        return (
+            PaginationBase[ToDoPublicSchema]
+            .model_validate(page, from_attributes=True)
+            .model_dump_json()
+            .encode()
+        )
+
+    def fast():
+        return dumps({**page, 'result': rows_to_dicts(page['result'], ToDoPublicSchema)})
+
+    before, after = _per_page(validated), _per_page(fast)
+
+    _report('GET /todo/', before, after)
+    assert validated() == fast()
+
+
+@pytest.mark.benchmark()
+def test_bench_list_users_serialization():
+    route = next(route for route in users.router.routes if route.name == 'list_users')
+    content = {
+        'users': [UserRow(n, f'user{n}', f'user{n}@test.com') for n in range(PAGE_SIZE)],
+        'next_cursor': None,
+    }
+
+    def validated():
+        # what FastAPI does with the dict list_users returns
+        value, _ = route.response_field.validate(content, {}, loc=('response',))
+        return JSONResponse(route.response_field.serialize(value)).body
+
+    def fast():
+        return json_response(
+            dumps({
+                **content,
+                'users': rows_to_dicts(content['users'], UserPublicSchema),
+            })
+        ).body
+
+    before, after = _per_page(validated), _per_page(fast)
+
+    _report('GET /users/', before, after)
+    assert validated() == fast()
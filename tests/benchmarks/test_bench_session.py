@@ -0,0 +1,98 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from fast_zero.app import app
+from fast_zero.database import (
+    ThreadedSession,
+    get_read_session,
+    get_read_session_scope,
+    get_session,
+)
+from fast_zero.security import create_access_token
+from tests.conftest import ToDoFactory
+
+REQUESTS = 1000
+CONCURRENCY = 50
+
+
+async def _drive(headers):
+    transport = ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async with AsyncClient(transport=transport, base_url='http://bench') as client:
+
+        async def call():
+            async with semaphore:
+                response = await client.get('/todo/?limit=20', headers=headers)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(call() for _ in range(REQUESTS)))
+        return REQUESTS / (time.perf_counter() - start)
+
+
+def _override_sessions(session_scope):
+    async def get_session_override():
+        async with session_scope() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_read_session] = get_session_override
+    app.dependency_overrides[get_read_session_scope] = lambda: session_scope
+
+
+async def _run_sync(engine, headers):
+    @asynccontextmanager
+    async def session_scope():
+        session = ThreadedSession(Session(engine))
+        try:
+            yield session
+        finally:
+            await session.close()
+
+    _override_sessions(session_scope)
+    return await _drive(headers)
+
+
+async def _run_async(engine, headers):
+    async_engine = create_async_engine(engine.url)
+
+    @asynccontextmanager
+    async def session_scope():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    _override_sessions(session_scope)
+    try:
+        return await _drive(headers)
+    finally:
+        await async_engine.dispose()
+
+
+@pytest.mark.benchmark()
+def test_bench_sync_vs_async_sessions(session, engine, user):
+    session.bulk_save_objects(ToDoFactory.create_batch(100, user_id=user.id))
+    session.commit()
+    headers = {
+        'Authorization': f'Bearer {create_access_token(data={"sub": user.email})}'
+    }
+
+    try:
+        sync_rps = asyncio.run(_run_sync(engine, headers))
+        async_rps = asyncio.run(_run_async(engine, headers))
+    finally:
+        app.dependency_overrides.clear()
+
+    print(
+        f'\nGET /todo/ x{REQUESTS} (concurrency {CONCURRENCY}): '
+        f'sync {sync_rps:.0f} req/s, async {async_rps:.0f} req/s '
+        f'({async_rps / sync_rps:.2f}x)'
+    )
+    assert sync_rps > 0
+    assert async_rps > 0
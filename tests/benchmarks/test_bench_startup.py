@@ -0,0 +1,101 @@
+"""Cold start: import time of the app and time to its first response.
+
+Both run in fresh interpreters, as a new worker or a scaled-from-zero
+container would. Each fails past its budget, in milliseconds, set with
+``BENCH_IMPORT_BUDGET_MS`` and ``BENCH_FIRST_RESPONSE_BUDGET_MS``.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+from statistics import median
+
+import httpx
+import pytest
+
+IMPORT_BUDGET_MS = float(os.environ.get('BENCH_IMPORT_BUDGET_MS', '2000'))
+FIRST_RESPONSE_BUDGET_MS = float(
+    os.environ.get('BENCH_FIRST_RESPONSE_BUDGET_MS', '10000')
+)
+ROUNDS = 5
+SLOWEST = 10
+
+
+def _import_times() -> list[tuple[str, int]]:
+    """``(module, cumulative microseconds)`` from ``python -X importtime``."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import fast_zero.app'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # what the app imports directly, and fast_zero modules at any depth
+        if not name.startswith('     ') or 'fast_zero' in name:
+            times.append((name.strip(), int(cumulative)))
+
+    return times
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.benchmark()
+def test_bench_import_time():
+    runs = [dict(_import_times()) for _ in range(ROUNDS)]
+    app_ms = median(run['fast_zero.app'] for run in runs) / 1000
+
+    slowest = sorted(runs[-1].items(), key=lambda item: item[1], reverse=True)
+    print(f'\nimport fast_zero.app: {app_ms:.0f}ms (median of {ROUNDS})')
+    for name, cumulative in slowest[:SLOWEST]:
+        print(f'  {name:<40} {cumulative / 1000:>7.1f}ms')
+
+    assert app_ms <= IMPORT_BUDGET_MS
+
+
+@pytest.mark.benchmark()
+def test_bench_time_to_first_response(session, engine):
+    port = _free_port()
+    env = {
+        **os.environ,
+        'DATABASE_URL': engine.url.render_as_string(hide_password=False),
+        'SERVER_WORKERS': '1',
+    }
+    url = f'http://127.0.0.1:{port}/health/ready'
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'fast_zero.server', '--host', '127.0.0.1'],
+        env={**env, 'SERVER_PORT': str(port)},
+    )
+    try:
+        while True:
+            try:
+                # readiness waits for the lifespan warmup
+                response = httpx.get(url)
+                break
+            except httpx.TransportError:
+                if time.perf_counter() - start > FIRST_RESPONSE_BUDGET_MS / 1000:
+                    pytest.fail('the server did not answer within the budget')
+                time.sleep(0.01)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        warmup_seconds = response.json()['warmup_seconds']
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f'\ntime to first response: {elapsed_ms:.0f}ms '
+        f'(warmup {warmup_seconds * 1000:.0f}ms)'
+    )
+    assert elapsed_ms <= FIRST_RESPONSE_BUDGET_MS
@@ -1,26 +1,60 @@
 # import factory
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+
 import factory.fuzzy
 import pytest
+from fastapi import Request
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
+from fast_zero import database
 from fast_zero.app import app
-from fast_zero.database import get_session
+from fast_zero.app import settings as app_settings
+from fast_zero.database import (
+    ReplicaSet,
+    ThreadedSession,
+    get_read_session,
+    get_read_session_scope,
+    get_session,
+    get_session_scope,
+    instrument,
+    read_session_scope,
+    recent_writers,
+    request_subject,
+)
 from fast_zero.models import ToDo, ToDoState, User, table_registry
+from fast_zero.routers.todo import response_cache
 from fast_zero.schemas import UserPublicSchema
-from fast_zero.security import get_password_hash
+from fast_zero.security import get_password_hash, user_cache
 
 
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
-        _engine = create_engine(postgres.get_connection_url())
+        _engine = instrument(create_engine(postgres.get_connection_url()))
 
         yield _engine
 
 
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    yield
+    user_cache.clear()
+    response_cache.clear()
+    recent_writers.clear()
+
+
+@pytest.fixture(autouse=True)
+def _no_warmup(monkeypatch):
+    # the lifespan would warm up the app's own engine, not the test database
+    monkeypatch.setattr(app_settings, 'WARMUP_ENABLED', False)
+
+
 @pytest.fixture()
 def session(engine):
     # engine = create_engine(
@@ -40,15 +74,130 @@ def session(engine):
 @pytest.fixture()
 def client(session):
     def get_session_override():
-        return session
+        return ThreadedSession(session)
+
+    @asynccontextmanager
+    async def session_scope_override():
+        yield ThreadedSession(session)
+
+    with TestClient(app) as client:
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_session_override
+        app.dependency_overrides[get_session_scope] = lambda: session_scope_override
+        app.dependency_overrides[get_read_session_scope] = lambda: session_scope_override
+        yield client
+
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def async_engine(engine):
+    # NullPool: pooled asyncio connections can't outlive the TestClient loop
+    return create_async_engine(engine.url, poolclass=NullPool)
+
+
+@pytest.fixture()
+def async_client(session, async_engine):
+    @asynccontextmanager
+    async def session_scope_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as _session:
+            yield _session
+
+    async def get_session_override():
+        async with session_scope_override() as _session:
+            yield _session
 
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_session_override
+        app.dependency_overrides[get_session_scope] = lambda: session_scope_override
+        app.dependency_overrides[get_read_session_scope] = lambda: session_scope_override
         yield client
 
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(scope='session')
+def replica_engine():
+    # a second server standing in for a streaming replica
+    with PostgresContainer('postgres:16', driver='psycopg') as postgres:
+        _engine = instrument(create_engine(postgres.get_connection_url()))
+
+        yield _engine
+
+
+@pytest.fixture()
+def replica_session(replica_engine):
+    table_registry.metadata.create_all(replica_engine)
+
+    with Session(replica_engine) as session:
+        yield session
+
+    table_registry.metadata.drop_all(replica_engine)
+
+
+@pytest.fixture()
+def replicas(replica_engine):
+    return ReplicaSet([replica_engine], retry_after=60)
+
+
+@pytest.fixture()
+def replica_client(session, engine, replica_session, replicas, monkeypatch):
+    """A client whose writes go to ``session`` and reads to ``replicas``."""
+    monkeypatch.setattr(database, 'get_replica_set', lambda: replicas)
+
+    def get_session_override():
+        return ThreadedSession(session)
+
+    async def get_read_session_override(request: Request):
+        async with read_session_scope(
+            request_subject(request), replicas, engine
+        ) as _session:
+            yield _session
+
+    def get_read_session_scope_override(request: Request):
+        return partial(read_session_scope, request_subject(request), replicas, engine)
+
+    with TestClient(app) as client:
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_read_session_override
+        app.dependency_overrides[get_read_session_scope] = (
+            get_read_session_scope_override
+        )
+        yield client
+
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def max_queries(engine):
+    """``with max_queries(n):`` fails if the block issues more than n statements.
+
+    Locks in the round-trip budget of a route; on failure the message lists
+    the statements that were run.
+    """
+
+    @contextmanager
+    def assert_max_queries(limit: int):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        assert len(statements) <= limit, (
+            f'{len(statements)} queries, expected at most {limit}:\n'
+            + '\n'.join(statements)
+        )
+
+    return assert_max_queries
+
+
 class UserFactory(factory.Factory):
     class Meta:
         model = User
@@ -105,6 +254,13 @@ def header_authorization(token):
     return {'Authorization': f'Bearer {token}'}
 
 
+@pytest.fixture()
+def diagnostics_authorization(monkeypatch):
+    """Turns on the diagnostics endpoints and returns the headers they want."""
+    monkeypatch.setattr(app_settings, 'DIAGNOSTICS_TOKEN', 'diagnostics')
+    return {'Authorization': 'Bearer diagnostics'}
+
+
 class ToDoFactory(factory.Factory):
     class Meta:
         model = ToDo
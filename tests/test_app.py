@@ -1,5 +1,10 @@
+import subprocess
+import sys
 from http import HTTPStatus
 
+from fast_zero import database, security
+from fast_zero.settings import get_settings
+
 
 def test_root_helo_word(client):
     response = client.get('/api')
@@ -24,3 +29,37 @@ def test_root_html(client):
 
     assert response.status_code == HTTPStatus.OK
     assert response.text == _html
+
+
+def test_settings_are_shared():
+    assert database.settings is security.settings is get_settings()
+
+
+def test_import_does_not_load_the_database_driver():
+    code = 'import sys, fast_zero.app; print("psycopg" in sys.modules)'
+    result = subprocess.run(
+        [sys.executable, '-c', code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == 'False'
+
+
+# generous: catches an import that got much heavier, not a slow machine;
+# tests/benchmarks/test_bench_startup.py has the tight budget
+IMPORT_BUDGET_MS = 5000
+
+
+def test_import_time_stays_within_budget():
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import fast_zero.app'],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = next(
+        int(line.split('|')[1])
+        for line in result.stderr.splitlines()
+        if line.endswith('| fast_zero.app')
+    )
+
+    assert cumulative / 1000 <= IMPORT_BUDGET_MS
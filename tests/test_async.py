@@ -0,0 +1,93 @@
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.models import ToDoState
+from tests.conftest import ToDoFactory
+
+
+@pytest.fixture()
+def async_header_authorization(async_client, user):
+    response = async_client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    return {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+
+def test_async_create_todo(async_client, async_header_authorization):
+    response = async_client.post(
+        '/todo/',
+        headers=async_header_authorization,
+        json={'title': 'Async', 'description': 'Async Description', 'state': 'todo'},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['title'] == 'Async'
+
+
+def test_async_list_to_dos(session, async_client, user, async_header_authorization):
+    expected_to_dos = 3
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(3, user_id=user.id, state=ToDoState.doing)
+    )
+    session.commit()
+
+    response = async_client.get(
+        '/todo/?state=doing',
+        headers=async_header_authorization,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()['result']) == expected_to_dos
+
+
+def test_async_update_user(async_client, user, async_header_authorization):
+    response = async_client.put(
+        f'/users/{user.id}',
+        headers=async_header_authorization,
+        json={
+            'username': 'async_user',
+            'email': 'async_user@test.com',
+            'password': 'async',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'id': user.id,
+        'username': 'async_user',
+        'email': 'async_user@test.com',
+    }
+
+
+def test_async_delete_user(async_client, user, async_header_authorization):
+    response = async_client.delete(
+        f'/users/{user.id}',
+        headers=async_header_authorization,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'User deleted'}
+
+
+def test_async_export_to_dos(session, async_client, user, async_header_authorization):
+    expected_to_dos = 3
+    session.bulk_save_objects(ToDoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+
+    response = async_client.get('/todo/export', headers=async_header_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.text.splitlines()) == expected_to_dos
+
+
+def test_async_import_to_dos(async_client, async_header_authorization):
+    response = async_client.post(
+        '/todo/import?format=csv',
+        headers=async_header_authorization,
+        content='title,description,state\r\na,b,todo\r\nc,d,done\r\n',
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 2  # noqa: PLR2004
@@ -0,0 +1,92 @@
+import asyncio
+
+import fakeredis
+import pytest
+from freezegun import freeze_time
+
+from fast_zero.cache import MemoryBackend, RedisBackend, ResponseCache, TTLCache
+
+
+def test_ttl_cache_hit_and_miss():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    assert cache.get('a') is None
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.stats() == {
+        'size': 1,
+        'maxsize': 2,
+        'hits': 1,
+        'misses': 1,
+        'hit_rate': 0.5,
+    }
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 'c')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 'c'
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    with freeze_time('2024-07-14 12:00:00') as frozen:
+        cache.set('a', 1)
+        frozen.tick(61)
+
+        assert cache.get('a') is None
+        assert len(cache) == 0
+
+
+def test_ttl_cache_disabled():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def response_cache_backend(request):
+    if request.param == 'redis':
+        return RedisBackend(fakeredis.FakeAsyncRedis(), ttl=60)
+    return MemoryBackend(maxsize=16, ttl=60)
+
+
+def test_response_cache_invalidates_only_the_scope(response_cache_backend):
+    cache = ResponseCache(response_cache_backend)
+
+    async def scenario():
+        first = await cache.key('todo:1', {'limit': 10, 'q': None})
+        other = await cache.key('todo:2', {'limit': 10})
+        await cache.set(first, '"a"', b'{}')
+        await cache.set(other, '"b"', b'[]')
+
+        hit = await cache.get(await cache.key('todo:1', {'limit': 10}))
+        await cache.invalidate('todo:1')
+        return (
+            hit,
+            await cache.get(await cache.key('todo:1', {'limit': 10})),
+            await cache.get(await cache.key('todo:2', {'limit': 10})),
+        )
+
+    assert asyncio.run(scenario()) == (('"a"', b'{}'), None, ('"b"', b'[]'))
+    assert cache.stats()['hit_rate'] == 2 / 3
+
+
+def test_response_cache_disabled():
+    cache = ResponseCache()
+
+    async def scenario():
+        key = await cache.key('todo:1', {})
+        await cache.set(key, '"a"', b'{}')
+        return await cache.get(key)
+
+    assert asyncio.run(scenario()) is None
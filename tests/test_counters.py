@@ -0,0 +1,55 @@
+import json
+
+from sqlalchemy import select, update
+
+from fast_zero import counters
+from fast_zero.counters import reconcile_user_sync
+from fast_zero.models import ToDoState, ToDoStateCount
+from tests.conftest import ToDoFactory
+
+
+def _counts(session, user_id):
+    return dict(
+        session.execute(
+            select(ToDoStateCount.state, ToDoStateCount.count).where(
+                ToDoStateCount.user_id == user_id
+            )
+        ).all()
+    )
+
+
+def test_reconcile_repairs_drift(session, user):
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(2, user_id=user.id, state=ToDoState.todo)
+    )
+    session.commit()
+    session.execute(
+        update(ToDoStateCount)
+        .where(ToDoStateCount.user_id == user.id)
+        .values(count=ToDoStateCount.count + 5)
+    )
+    session.execute(
+        ToDoStateCount.__table__.insert().values(
+            user_id=user.id, state=ToDoState.done, count=1
+        )
+    )
+
+    drift = reconcile_user_sync(session, user.id)
+    session.commit()
+
+    assert drift == {ToDoState.todo: 2, ToDoState.done: 0}
+    assert _counts(session, user.id) == {ToDoState.todo: 2, ToDoState.done: 0}
+    assert reconcile_user_sync(session, user.id) == {}
+
+
+def test_reconcile_cli(session, user, capsys):
+    database_url = session.bind.url.render_as_string(hide_password=False)
+    session.bulk_save_objects(ToDoFactory.create_batch(1, user_id=user.id))
+    session.commit()
+    session.execute(update(ToDoStateCount).values(count=0))
+    session.commit()
+
+    counters.main(['--email', user.email, '--database-url', database_url])
+
+    assert json.loads(capsys.readouterr().out)['users'] == 1
+    assert sum(_counts(session, user.id).values()) == 1
@@ -0,0 +1,145 @@
+import logging
+import sqlite3
+from http import HTTPStatus
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from fast_zero import database
+from fast_zero.database import (
+    PoolWaitStats,
+    QueryStats,
+    ThreadedSession,
+    TimedAsyncQueuePool,
+    TimedQueuePool,
+    engine_options,
+    pool_stats,
+    release_connection,
+)
+from fast_zero.models import User
+from fast_zero.settings import Settings
+
+
+def test_pool_stats_endpoint(client, diagnostics_authorization):
+    response = client.get('/health/pool', headers=diagnostics_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()) == {
+        'pool',
+        'size',
+        'checked_out',
+        'idle',
+        'overflow',
+        'wait_count',
+        'wait_total_seconds',
+        'wait_max_seconds',
+    }
+
+
+def test_pool_stats_reports_checked_out_connections(engine):
+    with engine.connect():
+        stats = pool_stats(engine)
+
+    assert stats['pool'] == 'QueuePool'
+    assert stats['checked_out'] == 1
+
+
+def test_timed_pool_records_wait():
+    pool = TimedQueuePool(lambda: sqlite3.connect(':memory:'))
+    pool.wait = PoolWaitStats()
+
+    pool.connect().close()
+
+    assert pool.wait.count == 1
+    assert pool.wait.total == pool.wait.max
+    assert pool.wait.total >= 0
+
+
+def test_engine_options_time_the_pool():
+    assert engine_options(Settings())['poolclass'] is TimedQueuePool
+    assert (
+        engine_options(Settings(DATABASE_ASYNC=True))['poolclass'] is TimedAsyncQueuePool
+    )
+
+
+def test_release_connection_keeps_instances(client, engine, user):
+    with Session(engine, expire_on_commit=False) as sync_session:
+        loaded = sync_session.get(User, user.id)
+
+        client.portal.call(release_connection, ThreadedSession(sync_session))
+
+        assert not sync_session.in_transaction()
+        assert 'email' in loaded.__dict__
+
+
+def test_engine_options_from_settings():
+    expected_pool_size = 20
+    options = engine_options(
+        Settings(DATABASE_POOL_SIZE=expected_pool_size, DATABASE_POOL_USE_LIFO=True)
+    )
+
+    assert options['pool_size'] == expected_pool_size
+    assert options['pool_use_lifo'] is True
+
+
+def test_engine_options_null_pool():
+    options = engine_options(Settings(DATABASE_NULL_POOL=True))
+
+    assert options['poolclass'] is NullPool
+    assert options['connect_args'] == {'prepare_threshold': None}
+
+
+def test_diagnostics_are_off_without_a_token(client):
+    for url in ('/health/pool', '/health/cache', '/metrics'):
+        assert client.get(url).status_code == HTTPStatus.NOT_FOUND
+
+
+def test_diagnostics_want_the_token(client, diagnostics_authorization):
+    response = client.get(
+        '/health/pool', headers={'Authorization': 'Bearer not-the-token'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_cache_stats_endpoint(client, diagnostics_authorization):
+    response = client.get('/health/cache', headers=diagnostics_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['user'] == {
+        'size': 0,
+        'maxsize': 1024,
+        'hits': 0,
+        'misses': 0,
+        'hit_rate': 0.0,
+    }
+
+
+def test_query_stats_server_timing():
+    stats = QueryStats()
+    stats.record('SELECT 1', 0.002)
+    stats.record('SELECT 2', 0.010)
+    stats.record('SELECT 3', 0.001)
+
+    assert stats.count == 3  # noqa: PLR2004
+    assert stats.slowest_statement == 'SELECT 2'
+    assert stats.server_timing() == ('db;dur=13.0;desc="3 queries", db-slowest;dur=10.0')
+
+
+def test_server_timing_header(client):
+    response = client.get('/health/ready')
+
+    assert response.headers['Server-Timing'] == (
+        'db;dur=0.0;desc="0 queries", db-slowest;dur=0.0'
+    )
+
+
+def test_slow_queries_are_logged(session, monkeypatch, caplog):
+    monkeypatch.setattr(database.settings, 'DATABASE_SLOW_QUERY_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger='fast_zero.sql'):
+        session.execute(text('SELECT 1'))
+
+    assert 'slow query' in caplog.text
+    assert 'SELECT 1' in caplog.text
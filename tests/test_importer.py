@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from sqlalchemy import select
+
+from fast_zero import importer
+from fast_zero.importer import ImportFormatError, ToDoImporter
+from fast_zero.models import ToDo
+
+
+def test_importer_handles_records_split_across_chunks():
+    to_do_importer = ToDoImporter(1, 'csv')
+
+    for text in ('title,descr', 'iption,state\nfir', 'st,"a\n', 'b",done\n'):
+        to_do_importer.feed(text)
+    to_do_importer.finish()
+
+    assert to_do_importer.take() == [('first', 'a\nb', 'done', 1)]
+
+
+def test_importer_bounds_reported_errors():
+    to_do_importer = ToDoImporter(1, 'ndjson', max_errors=2)
+
+    to_do_importer.feed('{}\n' * 5)
+    to_do_importer.finish()
+
+    assert to_do_importer.rejected == 5  # noqa: PLR2004
+    assert len(to_do_importer.errors) == 2  # noqa: PLR2004
+
+
+def test_importer_rejects_unterminated_quote():
+    to_do_importer = ToDoImporter(1, 'csv')
+
+    to_do_importer.feed('title,description,state\nfirst,"open,todo\n')
+    to_do_importer.finish()
+
+    assert to_do_importer.errors == [{'line': 2, 'detail': 'Unterminated quoted field.'}]
+
+
+def test_importer_keeps_bare_quotes_inside_fields():
+    to_do_importer = ToDoImporter(1, 'csv')
+
+    to_do_importer.feed(
+        'title,description,state\n'
+        'TV,"55"" screen",todo\n'
+        'TV,55" screen,todo\n'
+        'second,plain,done\n'
+    )
+    to_do_importer.finish()
+
+    assert to_do_importer.errors == []
+    assert to_do_importer.take() == [
+        ('TV', '55" screen', 'todo', 1),
+        ('TV', '55" screen', 'todo', 1),
+        ('second', 'plain', 'done', 1),
+    ]
+
+
+def test_importer_rejects_records_over_the_size_limit():
+    to_do_importer = ToDoImporter(1, 'csv', max_record_size=32)
+
+    to_do_importer.feed(
+        'title,description,state\n'
+        'long,"' + 'x\n' * 40 + '",todo\n'
+        'second,plain,done\n'
+    )
+    to_do_importer.finish()
+
+    assert to_do_importer.errors == [
+        {'line': 2, 'detail': 'Record is longer than 32 characters.'}
+    ]
+    assert to_do_importer.take() == [('second', 'plain', 'done', 1)]
+
+
+def test_importer_rejects_lines_over_the_size_limit():
+    to_do_importer = ToDoImporter(1, 'ndjson', max_record_size=32)
+
+    with pytest.raises(ImportFormatError, match='Line 1 is longer'):
+        to_do_importer.feed('{"title": "' + 'x' * 40)
+
+
+def test_importer_rejects_characters_postgres_cannot_store():
+    to_do_importer = ToDoImporter(1, 'ndjson')
+
+    to_do_importer.feed(
+        '{"title": "nul\\u0000", "description": "", "state": "todo"}\n'
+        '{"title": "a", "description": "\\ud800", "state": "todo"}\n'
+        '{"title": "fine", "description": "", "state": "todo"}\n'
+    )
+    to_do_importer.finish()
+
+    assert to_do_importer.errors == [
+        {'line': 1, 'detail': 'title: Contains a character that cannot be stored'},
+        {
+            'line': 2,
+            'detail': 'description: Contains a character that cannot be stored',
+        },
+    ]
+    assert to_do_importer.take() == [('fine', '', 'todo', 1)]
+
+
+def test_importer_requires_csv_header():
+    with pytest.raises(ImportFormatError):
+        ToDoImporter(1, 'csv').feed('title,state\n')
+
+
+def test_importer_cli(session, user, tmp_path, capsys):
+    database_url = session.bind.url.render_as_string(hide_password=False)
+    path = tmp_path / 'todos.ndjson'
+    path.write_text(
+        '{"title": "a", "description": "b", "state": "todo"}\n'
+        '{"title": "c", "description": "d", "state": "nope"}\n'
+    )
+
+    importer.main([str(path), '--email', user.email, '--database-url', database_url])
+
+    assert json.loads(capsys.readouterr().out)['imported'] == 1
+    assert session.scalars(select(ToDo.title)).all() == ['a']
@@ -0,0 +1,63 @@
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.metrics import Registry
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram('latency', 'Latency.', ('route',), buckets=(1, 5))
+
+    for value in (0.5, 1, 3, 8):
+        histogram.observe(value, ('/a',))
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_bucket{route="/a",le="1"} 2',
+        'latency_bucket{route="/a",le="5"} 3',
+        'latency_bucket{route="/a",le="+Inf"} 4',
+        'latency_sum{route="/a"} 12.5',
+        'latency_count{route="/a"} 4',
+    ]
+
+
+def test_counter_escapes_label_values_and_runs_collectors():
+    registry = Registry()
+    counter = registry.counter('hits_total', 'Hits.', ('path',))
+    counter.inc(('say "hi"\\',))
+    registry.collector(lambda: counter.set(7, ('collected',)))
+
+    assert registry.render() == (
+        '# HELP hits_total Hits.\n'
+        '# TYPE hits_total counter\n'
+        'hits_total{path="say \\"hi\\"\\\\"} 1\n'
+        'hits_total{path="collected"} 7\n'
+    )
+
+
+def test_histogram_time_skips_failures():
+    histogram = Registry().histogram('op_seconds', 'Op time.')
+
+    with histogram.time():
+        pass
+    with pytest.raises(ValueError, match='failed'), histogram.time():
+        raise ValueError('failed')
+
+    counts, _ = histogram.values[()]
+    assert sum(counts) == 1
+
+
+def test_metrics_endpoint_labels_requests_by_route(
+    client, user, diagnostics_authorization
+):
+    client.get(f'/users/{user.id}')
+
+    response = client.get('/metrics', headers=diagnostics_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert (
+        'http_requests_total{method="GET",route="/users/{user_id}",status="200"}'
+        in response.text
+    )
+    assert 'db_pool_connections{state="checked_out"}' in response.text
@@ -0,0 +1,91 @@
+import re
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from fast_zero.models import ToDo, ToDoState
+from tests.conftest import UserFactory
+
+USERS = 20
+TODOS_PER_USER = 1000
+
+
+def scans_table(plan: str) -> bool:
+    """True for a Seq Scan, or an index walk that filters the owner row by row.
+
+    Without an index leading on user_id the planner can satisfy
+    ``ORDER BY id LIMIT n`` by walking todo_pkey and filtering on user_id,
+    which touches the whole table just like a sequential scan.
+    """
+    if 'Seq Scan on todo' in plan:
+        return True
+
+    filters_owner = re.search(r'Filter: .*user_id = ', plan)
+    primary_key_lookup = re.search(r'Index Cond: \(id = \d+\)', plan)
+    return bool(filters_owner) and not primary_key_lookup
+
+
+@pytest.fixture()
+def _seeded_todos(session, user):
+    session.add_all(UserFactory.create_batch(USERS - 1))
+    session.commit()
+
+    states = list(ToDoState)
+    session.execute(
+        insert(ToDo),
+        [
+            {
+                'user_id': user_id,
+                'title': f'title {n}',
+                'description': f'description {n}',
+                'state': states[n % len(states)],
+            }
+            for user_id in range(1, USERS + 1)
+            for n in range(TODOS_PER_USER)
+        ],
+    )
+    session.commit()
+    session.execute(text('ANALYZE todo'))
+    session.commit()
+
+
+@pytest.fixture()
+def todo_statements(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):  # noqa: PLR0913 PLR0917
+        if 'todo' in statement and not statement.startswith('INSERT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', capture)
+
+
+@pytest.mark.usefixtures('_seeded_todos')
+def test_todo_routes_do_not_seq_scan(
+    client, header_authorization, session, todo_statements
+):
+    first_page = client.get('/todo/?limit=5', headers=header_authorization).json()
+    client.get(
+        f'/todo/?limit=5&cursor={first_page["next_cursor"]}',
+        headers=header_authorization,
+    )
+    client.get('/todo/?state=done&offset=20', headers=header_authorization)
+    client.get('/todo/?title=title 1&description=desc', headers=header_authorization)
+    client.get('/todo/?q=title 12', headers=header_authorization)
+    client.get('/todo/42', headers=header_authorization)
+    client.patch('/todo/42', headers=header_authorization, json={'state': 'done'})
+    client.delete('/todo/43', headers=header_authorization)
+
+    statements = list(todo_statements)
+
+    assert statements
+    for statement, parameters in statements:
+        plan = '\n'.join(
+            row[0]
+            for row in session.connection().exec_driver_sql(
+                f'EXPLAIN {statement}', parameters
+            )
+        )
+        assert not scans_table(plan), f'{statement}\n{plan}'
@@ -1,6 +1,20 @@
+import asyncio
+from datetime import datetime
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
 from jwt import decode
 
-from fast_zero.security import create_access_token, settings
+from fast_zero.cache import MemoryBackend
+from fast_zero.models import User
+from fast_zero.security import (
+    PasswordHasherPool,
+    UserCache,
+    create_access_token,
+    settings,
+    user_cache,
+)
 
 
 def test_jwt():
@@ -11,3 +25,114 @@ def test_jwt():
 
     assert decoded['sub'] == data['sub']
     assert decoded['exp']  # Testa se o valor de exp foi adicionado ao toke
+
+
+def test_get_current_user_is_cached(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    client.post('/auth/refresh_token', headers=headers)
+    client.post('/auth/refresh_token', headers=headers)
+
+    assert user_cache.stats()['hits'] == 1
+    assert user_cache.stats()['misses'] == 1
+
+
+def test_update_user_invalidates_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/auth/refresh_token', headers=headers)
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={'username': 'cached', 'email': 'cached@test.com', 'password': 'x'},
+    )
+    # the token's e-mail is gone: a cached copy would still let it in
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_invalidates_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.fixture()
+def loaded_user():
+    """A ``User`` as loaded from the database, without one."""
+    user = User(username='cached', password='hash', email='cached@test.com')
+    user.id = 1
+    user.created_at = user.updated_at = datetime(2024, 1, 1, 12, 30)
+    return user
+
+
+def test_user_cache_round_trip(loaded_user):
+    cache = UserCache(MemoryBackend(maxsize=10, ttl=60))
+
+    async def round_trip():
+        generation = await cache.generation(loaded_user.email)
+        await cache.set(loaded_user.email, generation, loaded_user)
+        return await cache.get(loaded_user.email, generation)
+
+    cached = asyncio.run(round_trip())
+
+    assert (cached.id, cached.email, cached.password) == (
+        loaded_user.id,
+        loaded_user.email,
+        loaded_user.password,
+    )
+    assert cached.created_at == loaded_user.created_at
+
+
+def test_user_cache_invalidate_reaches_the_shared_generation(loaded_user):
+    cache = UserCache(MemoryBackend(maxsize=10, ttl=60))
+
+    async def invalidated():
+        generation = await cache.generation(loaded_user.email)
+        await cache.set(loaded_user.email, generation, loaded_user)
+        await cache.invalidate(loaded_user.email)
+        return await cache.get(
+            loaded_user.email, await cache.generation(loaded_user.email)
+        )
+
+    assert asyncio.run(invalidated()) is None
+
+
+def test_user_cache_skips_copies_read_before_an_invalidation(loaded_user):
+    cache = UserCache(MemoryBackend(maxsize=10, ttl=60))
+
+    async def raced():
+        generation = await cache.generation(loaded_user.email)
+        # the user is deleted while this lookup is querying the database
+        await cache.invalidate(loaded_user.email)
+        await cache.set(loaded_user.email, generation, loaded_user)
+        return await cache.get(loaded_user.email, generation)
+
+    assert asyncio.run(raced()) is None
+
+
+def test_password_hasher_pool_hash_and_verify():
+    pool = PasswordHasherPool(workers=1, max_pending=4)
+
+    async def hash_and_verify():
+        hashed = await pool.hash('secret')
+        return await pool.verify('secret', hashed), await pool.verify('wrong', hashed)
+
+    try:
+        assert asyncio.run(hash_and_verify()) == (True, False)
+    finally:
+        pool.shutdown()
+
+
+def test_password_hasher_pool_rejects_when_saturated():
+    pool = PasswordHasherPool(workers=0, max_pending=0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(pool.hash('secret'))
+
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert pool.rejected == 1
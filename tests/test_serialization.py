@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from fast_zero.schemas import (
+    PaginationBase,
+    ToDoPublicSchema,
+    UserListSchema,
+    UserPublicSchema,
+)
+from fast_zero.serialization import dumps, rows_to_dicts
+from tests.conftest import ToDoFactory, UserFactory
+
+
+def _to_dos(count):
+    to_dos = ToDoFactory.create_batch(count)
+    for to_do_id, to_do in enumerate(to_dos, start=1):
+        to_do.id = to_do_id
+        to_do.created_at = datetime(2024, 7, 1, 12, 30, 15, 123456)
+        to_do.updated_at = datetime(2024, 7, 2)
+
+    return to_dos
+
+
+def test_to_do_page_matches_response_model():
+    to_dos = _to_dos(3)
+    page = {
+        'result': to_dos,
+        'offset': 0,
+        'limit': 3,
+        'next_cursor': 'abc',
+        'total': 1000,
+        'total_relation': 'gte',
+    }
+
+    expected = (
+        PaginationBase[ToDoPublicSchema]
+        .model_validate(page, from_attributes=True)
+        .model_dump_json()
+        .encode()
+    )
+    body = dumps({**page, 'result': rows_to_dicts(to_dos, ToDoPublicSchema)})
+
+    assert body == expected
+
+
+def test_user_list_matches_response_model():
+    users = UserFactory.create_batch(2)
+    for user_id, user in enumerate(users, start=1):
+        user.id = user_id
+    content = {'users': users, 'next_cursor': None}
+
+    expected = UserListSchema.model_validate(content, from_attributes=True)
+    body = dumps({**content, 'users': rows_to_dicts(users, UserPublicSchema)})
+
+    assert body == expected.model_dump_json().encode()
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy.pool import QueuePool
+
+from fast_zero import database
+from fast_zero.server import (
+    available_cpus,
+    main,
+    per_worker_overrides,
+    worker_count,
+)
+from fast_zero.settings import Settings, get_settings
+
+
+def test_available_cpus_without_quota(tmp_path):
+    cpu_max = tmp_path / 'cpu.max'
+    cpu_max.write_text('max 100000\n')
+
+    assert available_cpus(cpu_max) == available_cpus(tmp_path / 'missing')
+
+
+def test_available_cpus_rounds_quota_up(tmp_path):
+    cpu_max = tmp_path / 'cpu.max'
+    cpu_max.write_text('50000 100000\n')
+
+    assert available_cpus(cpu_max) == 1
+
+
+def test_worker_count_from_settings():
+    expected_workers = 3
+
+    assert worker_count(Settings(SERVER_WORKERS=expected_workers)) == expected_workers
+
+
+def test_worker_count_defaults_to_available_cpus():
+    assert worker_count(Settings()) == available_cpus()
+
+
+def test_per_worker_caches_are_kept_with_one_worker():
+    settings = Settings(USER_CACHE_BACKEND='memory', TODO_CACHE_BACKEND='memory')
+
+    assert per_worker_overrides(settings, 1) == {}
+
+
+def test_per_worker_caches_are_turned_off_with_more_workers():
+    settings = Settings(USER_CACHE_BACKEND='memory', TODO_CACHE_BACKEND='memory')
+
+    assert per_worker_overrides(settings, 2) == {
+        'USER_CACHE_BACKEND': 'none',
+        'TODO_CACHE_BACKEND': 'none',
+    }
+
+
+def test_shared_caches_are_kept_with_more_workers():
+    settings = Settings(USER_CACHE_BACKEND='redis', TODO_CACHE_BACKEND='redis')
+
+    assert per_worker_overrides(settings, 2) == {}
+
+
+def test_replicas_with_more_workers_need_shared_writers(monkeypatch):
+    monkeypatch.setattr(get_settings(), 'DATABASE_REPLICA_URLS', ['replica'])
+    monkeypatch.setattr(get_settings(), 'DATABASE_READ_YOUR_WRITES_BACKEND', 'memory')
+
+    with pytest.raises(SystemExit):
+        main(['--workers', '2'])
+
+
+def test_pool_is_replaced_after_fork():
+    engine = database.get_engine()
+    sync_engine = getattr(engine, 'sync_engine', engine)
+    pool = sync_engine.pool
+
+    database._reset_pool_after_fork()
+
+    assert sync_engine.pool is not pool
+    assert isinstance(sync_engine.pool, QueuePool)
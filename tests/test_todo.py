@@ -1,9 +1,18 @@
+import csv
+import io
+import json
+from base64 import urlsafe_b64encode
 from datetime import datetime
 from http import HTTPStatus
 
 import pytest
+from sqlalchemy import func, select
 
-from fast_zero.models import ToDoState
+from fast_zero.cache import MemoryBackend
+from fast_zero.models import ToDo, ToDoState
+from fast_zero.routers.todo import response_cache, settings
+from fast_zero.schemas import BULK_MAX_ITEMS
+from fast_zero.security import create_access_token, user_cache
 from tests.conftest import ToDoFactory
 
 
@@ -279,3 +288,634 @@ def test_delete_todo_not_found(client, header_authorization):
 
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'ToDo not found.'}
+
+
+def test_list_to_dos_cursor_walks_all_pages(session, client, user, header_authorization):
+    expected_to_dos = 7
+    session.bulk_save_objects(ToDoFactory.create_batch(7, user_id=user.id))
+    session.commit()
+
+    ids = []
+    response = client.get('/todo/?limit=3', headers=header_authorization)
+    ids.extend(todo['id'] for todo in response.json()['result'])
+
+    while cursor := response.json()['next_cursor']:
+        response = client.get(
+            f'/todo/?limit=3&cursor={cursor}', headers=header_authorization
+        )
+        ids.extend(todo['id'] for todo in response.json()['result'])
+
+    assert len(ids) == expected_to_dos
+    assert ids == sorted(set(ids))
+
+
+def test_list_to_dos_cursor_respects_filters(
+    session, client, user, header_authorization
+):
+    expected_to_dos = 2
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(4, user_id=user.id, state=ToDoState.done)
+    )
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(4, user_id=user.id, state=ToDoState.doing)
+    )
+    session.commit()
+
+    first_page = client.get(
+        '/todo/?state=done&limit=2', headers=header_authorization
+    ).json()
+    second_page = client.get(
+        f'/todo/?state=done&limit=2&cursor={first_page["next_cursor"]}',
+        headers=header_authorization,
+    ).json()
+
+    assert len(second_page['result']) == expected_to_dos
+    assert all(todo['state'] == 'done' for todo in second_page['result'])
+    assert second_page['result'][0]['id'] > first_page['result'][-1]['id']
+
+
+def test_list_to_dos_invalid_cursor(client, header_authorization):
+    response = client.get('/todo/?cursor=not-a-cursor', headers=header_authorization)
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor.'}
+
+
+@pytest.mark.parametrize('position', ['{"id":Infinity}', '{"id":1e400}'])
+def test_list_to_dos_cursor_out_of_range(client, header_authorization, position):
+    cursor = urlsafe_b64encode(position.encode()).decode()
+
+    response = client.get(f'/todo/?cursor={cursor}', headers=header_authorization)
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor.'}
+
+
+def test_list_to_dos_search_ranks_title_matches_first(
+    session, client, user, header_authorization
+):
+    expected_to_dos = 2
+    session.add(
+        ToDoFactory(
+            user_id=user.id, title='Buy bread', description='groceries for dinner'
+        )
+    )
+    session.add(
+        ToDoFactory(user_id=user.id, title='Groceries', description='milk and eggs')
+    )
+    session.add(ToDoFactory(user_id=user.id, title='Gym', description='leg day'))
+    session.commit()
+
+    response = client.get('/todo/?q=groceries', headers=header_authorization)
+
+    result = response.json()['result']
+    assert response.status_code == HTTPStatus.OK
+    assert len(result) == expected_to_dos
+    assert [todo['title'] for todo in result] == ['Groceries', 'Buy bread']
+    assert response.json()['next_cursor'] is None
+
+
+def test_list_to_dos_search_rejects_cursor(client, header_authorization):
+    response = client.get('/todo/?q=groceries&cursor=e30', headers=header_authorization)
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {
+        'detail': 'Cursor pagination is not available for ranked search.'
+    }
+
+
+def test_create_todos_bulk(client, header_authorization):
+    expected_to_dos = 3
+    response = client.post(
+        '/todo/bulk',
+        headers=header_authorization,
+        json=[
+            {'title': f'Bulk {n}', 'description': 'Bulk Description', 'state': 'todo'}
+            for n in range(3)
+        ],
+    )
+
+    result = response.json()['result']
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(result) == expected_to_dos
+    assert [todo['title'] for todo in result] == ['Bulk 0', 'Bulk 1', 'Bulk 2']
+    assert [todo['id'] for todo in result] == [1, 2, 3]
+    assert all('created_at' in todo for todo in result)
+
+
+def test_create_todos_bulk_empty(client, header_authorization):
+    response = client.post('/todo/bulk', headers=header_authorization, json=[])
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json() == {'result': []}
+
+
+def test_create_todos_bulk_too_large(client, header_authorization):
+    response = client.post(
+        '/todo/bulk',
+        headers=header_authorization,
+        json=[{'title': 'a', 'description': 'a', 'state': 'todo'}]
+        * (BULK_MAX_ITEMS + 1),
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()['detail'][0]['type'] == 'too_long'
+
+
+def test_create_todos_bulk_invalid_item(client, header_authorization):
+    response = client.post(
+        '/todo/bulk',
+        headers=header_authorization,
+        json=[
+            {'title': 'a', 'description': 'a', 'state': 'todo'},
+            {'title': 'b', 'description': 'b', 'state': 'invalid'},
+        ],
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()['detail'][0]['loc'] == ['body', 1, 'state']
+    # all or nothing: the valid item is not created either
+    response = client.get('/todo/', headers=header_authorization)
+    assert response.json()['result'] == []
+
+
+def test_edit_to_dos_bulk_too_many_ids(client, header_authorization):
+    response = client.patch(
+        '/todo/bulk',
+        headers=header_authorization,
+        json={
+            'ids': list(range(BULK_MAX_ITEMS + 1)),
+            'changes': {'state': 'done'},
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json()['detail'][0]['type'] == 'too_long'
+
+
+def test_edit_to_dos_bulk_by_ids(session, client, user, header_authorization):
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(4, user_id=user.id, state=ToDoState.todo)
+    )
+    session.commit()
+
+    response = client.patch(
+        '/todo/bulk',
+        headers=header_authorization,
+        json={'ids': [1, 3], 'changes': {'state': 'done'}},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert sorted(todo['id'] for todo in response.json()['result']) == [1, 3]
+    assert all(todo['state'] == 'done' for todo in response.json()['result'])
+
+    response = client.get('/todo/?state=done', headers=header_authorization)
+    assert [todo['id'] for todo in response.json()['result']] == [1, 3]
+
+
+def test_edit_to_dos_bulk_by_filter_is_scoped_to_user(  # noqa: PLR0913 PLR0917
+    session, client, user, other_user, header_authorization
+):
+    expected_to_dos = 3
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(3, user_id=user.id, state=ToDoState.done)
+    )
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(2, user_id=other_user.id, state=ToDoState.done)
+    )
+    session.commit()
+
+    response = client.patch(
+        '/todo/bulk',
+        headers=header_authorization,
+        json={'state': 'done', 'changes': {'state': 'trash'}},
+    )
+
+    assert len(response.json()['result']) == expected_to_dos
+    assert all(todo['state'] == 'trash' for todo in response.json()['result'])
+
+
+def test_edit_to_dos_bulk_requires_selector(client, header_authorization):
+    response = client.patch(
+        '/todo/bulk',
+        headers=header_authorization,
+        json={'changes': {'state': 'trash'}},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_edit_to_dos_bulk_requires_changes(client, header_authorization):
+    response = client.patch(
+        '/todo/bulk',
+        headers=header_authorization,
+        json={'ids': [1], 'changes': {}},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'No changes.'}
+
+
+def test_delete_to_dos_bulk(session, client, user, header_authorization):
+    expected_remaining = 2
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(3, user_id=user.id, title='Old report')
+    )
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(2, user_id=user.id, title='New report')
+    )
+    session.commit()
+
+    response = client.post(
+        '/todo/bulk/delete',
+        headers=header_authorization,
+        json={'title': 'old'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert sorted(response.json()['ids']) == [1, 2, 3]
+
+    response = client.get('/todo/', headers=header_authorization)
+    assert len(response.json()['result']) == expected_remaining
+
+
+def test_export_to_dos_ndjson(session, client, user, header_authorization):
+    expected_to_dos = 5
+    session.bulk_save_objects(ToDoFactory.create_batch(5, user_id=user.id))
+    session.commit()
+
+    response = client.get('/todo/export', headers=header_authorization)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert len(lines) == expected_to_dos
+    assert [line['id'] for line in lines] == [1, 2, 3, 4, 5]
+    assert set(lines[0]) == {
+        'id',
+        'title',
+        'description',
+        'state',
+        'created_at',
+        'updated_at',
+    }
+
+
+def test_export_to_dos_csv_honors_filters(session, client, user, header_authorization):
+    expected_to_dos = 2
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(2, user_id=user.id, state=ToDoState.done)
+    )
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(3, user_id=user.id, state=ToDoState.draft)
+    )
+    session.commit()
+
+    response = client.get(
+        '/todo/export?format=csv&state=done', headers=header_authorization
+    )
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    assert len(rows) == expected_to_dos
+    assert all(row['state'] == 'done' for row in rows)
+
+
+def test_import_to_dos_csv(session, client, user, header_authorization):
+    body = (
+        'title,description,state\r\n'
+        'first,"multi\nline",todo\r\n'
+        'second,plain,unknown\r\n'
+        'third,plain,done\r\n'
+    )
+
+    response = client.post(
+        '/todo/import?format=csv', content=body, headers=header_authorization
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 2  # noqa: PLR2004
+    assert response.json()['rejected'] == 1
+    assert response.json()['errors'][0]['line'] == 4  # noqa: PLR2004
+    titles = session.scalars(
+        select(ToDo.title).where(ToDo.user_id == user.id).order_by(ToDo.id)
+    ).all()
+    assert titles == ['first', 'third']
+
+
+def test_import_to_dos_csv_with_byte_order_mark(session, client, header_authorization):
+    body = '\ufefftitle,description,state\r\nfirst,plain,todo\r\n'.encode()
+
+    response = client.post(
+        '/todo/import?format=csv', content=body, headers=header_authorization
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['imported'] == 1
+
+
+def test_import_to_dos_ndjson_in_chunks(  # noqa: PLR0913 PLR0917
+    session, client, user, header_authorization, monkeypatch
+):
+    monkeypatch.setattr(settings, 'TODO_IMPORT_CHUNK_SIZE', 2)
+    body = ''.join(
+        json.dumps({'title': f'todo {i}', 'description': '', 'state': 'draft'}) + '\n'
+        for i in range(5)
+    )
+
+    response = client.post(
+        '/todo/import?format=ndjson',
+        content=body + '{not json}\n',
+        headers=header_authorization,
+    )
+
+    assert response.json() == {
+        'imported': 5,
+        'rejected': 1,
+        'errors': [{'line': 6, 'detail': 'Invalid JSON.'}],
+    }
+    assert session.scalar(select(func.count()).select_from(ToDo)) == 5  # noqa: PLR2004
+
+
+def test_import_to_dos_csv_requires_header(session, client, header_authorization):
+    response = client.post(
+        '/todo/import?format=csv',
+        content='first,plain,todo\r\n',
+        headers=header_authorization,
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert session.scalar(select(func.count()).select_from(ToDo)) == 0
+
+
+def test_get_todo_conditional(session, client, user, header_authorization):
+    todo = ToDoFactory(user_id=user.id)
+    session.add(todo)
+    session.commit()
+    etag = client.get(f'/todo/{todo.id}', headers=header_authorization).headers['ETag']
+
+    response = client.get(
+        f'/todo/{todo.id}',
+        headers={**header_authorization, 'If-None-Match': f'"other", W/{etag}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    assert not response.content
+
+
+def test_list_to_dos_conditional(session, client, user, header_authorization):
+    session.bulk_save_objects(ToDoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+    etag = client.get('/todo/', headers=header_authorization).headers['ETag']
+    headers = {**header_authorization, 'If-None-Match': etag}
+
+    response = client.get('/todo/', headers=headers)
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+    to_do_id = client.get('/todo/', headers=header_authorization).json()['result'][0][
+        'id'
+    ]
+    client.patch(
+        f'/todo/{to_do_id}', headers=header_authorization, json={'title': 'changed'}
+    )
+    response = client.get('/todo/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['result'][0]['title'] == 'changed'
+    assert client.get('/todo/?limit=2', headers=headers).status_code == HTTPStatus.OK
+
+
+def test_edit_todo_if_match(session, client, user, header_authorization):
+    todo = ToDoFactory(user_id=user.id)
+    session.add(todo)
+    session.commit()
+    etag = client.get(f'/todo/{todo.id}', headers=header_authorization).headers['ETag']
+    headers = {**header_authorization, 'If-Match': etag}
+
+    response = client.patch(f'/todo/{todo.id}', headers=headers, json={'title': 'a'})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+    response = client.patch(f'/todo/{todo.id}', headers=headers, json={'title': 'b'})
+
+    assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+    assert response.json() == {'detail': 'ToDo has been modified.'}
+
+
+@pytest.fixture()
+def memory_response_cache(monkeypatch):
+    monkeypatch.setattr(response_cache, 'backend', MemoryBackend(maxsize=16, ttl=60))
+    return response_cache
+
+
+def test_list_to_dos_served_from_cache(  # noqa: PLR0913 PLR0917
+    session, client, user, other_user, header_authorization, memory_response_cache
+):
+    session.bulk_save_objects(ToDoFactory.create_batch(2, user_id=user.id))
+    session.commit()
+    first = client.get('/todo/?limit=5', headers=header_authorization)
+
+    # rows changed behind the API's back stay cached until a write goes through it
+    session.bulk_save_objects(ToDoFactory.create_batch(1, user_id=user.id))
+    session.commit()
+    cached = client.get('/todo/?limit=5&title=', headers=header_authorization)
+
+    assert cached.content == first.content
+    assert cached.headers['ETag'] == first.headers['ETag']
+    assert memory_response_cache.stats()['hits'] == 1
+
+    client.post(
+        '/todo/',
+        headers=header_authorization,
+        json={'title': 'new', 'description': '', 'state': 'todo'},
+    )
+    response = client.get('/todo/?limit=5', headers=header_authorization)
+
+    assert len(response.json()['result']) == 4  # noqa: PLR2004
+
+
+def test_list_to_dos_cache_hit_skips_the_database(  # noqa: PLR0913 PLR0917
+    session, client, user, header_authorization, memory_response_cache, max_queries
+):
+    session.bulk_save_objects(ToDoFactory.create_batch(2, user_id=user.id))
+    session.commit()
+    first = client.get('/todo/?limit=5', headers=header_authorization)
+    user_cache.clear()
+
+    # keyed on the token subject: neither the user nor the page is loaded
+    with max_queries(0):
+        cached = client.get('/todo/?limit=5', headers=header_authorization)
+
+    assert cached.content == first.content
+
+
+def test_list_to_dos_cache_follows_email_changes(  # noqa: PLR0913 PLR0917
+    session, client, user, header_authorization, memory_response_cache
+):
+    session.bulk_save_objects(ToDoFactory.create_batch(2, user_id=user.id))
+    session.commit()
+    email = user.email
+    client.get('/todo/', headers=header_authorization)
+    client.put(
+        f'/users/{user.id}',
+        headers=header_authorization,
+        json={'username': 'moved', 'email': 'moved@test.com', 'password': 'x'},
+    )
+    client.post(
+        '/users/',
+        json={'username': 'newcomer', 'email': email, 'password': 'x'},
+    )
+
+    # same subject as the cached pages, but another user's todos
+    token = create_access_token(data={'sub': email})
+    response = client.get('/todo/', headers={'Authorization': f'Bearer {token}'})
+
+    assert response.json()['result'] == []
+
+
+def test_list_to_dos_fast_serialization(
+    session, client, user, header_authorization, monkeypatch
+):
+    session.bulk_save_objects(ToDoFactory.create_batch(3, user_id=user.id))
+    session.commit()
+    expected = client.get('/todo/', headers=header_authorization)
+
+    monkeypatch.setattr(settings, 'FAST_SERIALIZATION', True)
+    response = client.get('/todo/', headers=header_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == expected.content
+    assert response.headers['ETag'] == expected.headers['ETag']
+
+
+def test_to_do_stats_follow_writes(session, client, user, header_authorization):
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(3, user_id=user.id, state=ToDoState.todo)
+    )
+    session.commit()
+    to_do_id = session.scalar(select(ToDo.id).limit(1))
+
+    client.patch(
+        f'/todo/{to_do_id}', headers=header_authorization, json={'state': 'done'}
+    )
+    client.delete(f'/todo/{to_do_id}', headers=header_authorization)
+    client.post(
+        '/todo/bulk',
+        headers=header_authorization,
+        json=[{'title': 'a', 'description': 'b', 'state': 'doing'}],
+    )
+    response = client.get('/todo/stats', headers=header_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'counts': {'draft': 0, 'todo': 2, 'doing': 1, 'done': 0, 'trash': 0},
+        'total': 3,
+    }
+
+
+def test_to_do_stats_are_per_user(session, client, other_user, header_authorization):
+    session.bulk_save_objects(ToDoFactory.create_batch(2, user_id=other_user.id))
+    session.commit()
+
+    response = client.get('/todo/stats', headers=header_authorization)
+
+    assert response.json()['total'] == 0
+
+
+def test_list_to_dos_total_from_state_counters(
+    session, client, user, header_authorization
+):
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(3, user_id=user.id, state=ToDoState.done)
+        + ToDoFactory.create_batch(2, user_id=user.id, state=ToDoState.draft)
+    )
+    session.commit()
+
+    response = client.get(
+        '/todo/?state=done&limit=1&total=estimated', headers=header_authorization
+    )
+
+    assert response.json()['total'] == 3  # noqa: PLR2004
+    assert response.json()['total_relation'] == 'eq'
+
+
+@pytest.mark.parametrize(
+    ('strategy', 'cap', 'expected'),
+    [('exact', 1000, (5, 'eq')), ('capped', 3, (3, 'gte')), ('capped', 5, (5, 'eq'))],
+)
+def test_list_to_dos_total_strategies(  # noqa: PLR0913 PLR0917
+    session, client, user, header_authorization, monkeypatch, strategy, cap, expected
+):
+    monkeypatch.setattr(settings, 'TODO_COUNT_CAP', cap)
+    session.bulk_save_objects(
+        ToDoFactory.create_batch(5, user_id=user.id, title='match')
+    )
+    session.commit()
+
+    response = client.get(
+        f'/todo/?title=match&limit=2&total={strategy}', headers=header_authorization
+    )
+
+    assert len(response.json()['result']) == 2  # noqa: PLR2004
+    assert (response.json()['total'], response.json()['total_relation']) == expected
+
+
+def test_list_to_dos_estimated_total(session, client, user, header_authorization):
+    session.bulk_save_objects(ToDoFactory.create_batch(5, user_id=user.id))
+    session.commit()
+
+    response = client.get('/todo/?title=a&total=estimated', headers=header_authorization)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_relation'] == 'approx'
+    assert response.json()['total'] >= 0
+
+
+def test_list_to_dos_exact_total_cached(
+    session, client, user, header_authorization, memory_response_cache
+):
+    session.bulk_save_objects(ToDoFactory.create_batch(2, user_id=user.id, title='x'))
+    session.commit()
+    client.get('/todo/?title=x&total=exact', headers=header_authorization)
+
+    # the cached count is reused for other pages of the same filters
+    session.bulk_save_objects(ToDoFactory.create_batch(1, user_id=user.id, title='x'))
+    session.commit()
+    response = client.get(
+        '/todo/?title=x&total=exact&offset=1', headers=header_authorization
+    )
+
+    assert response.json()['total'] == 2  # noqa: PLR2004
+
+
+def test_list_to_dos_without_total(client, header_authorization):
+    response = client.get('/todo/', headers=header_authorization)
+
+    assert response.json()['total'] is None
+
+
+def test_read_routes_query_budget(
+    session, client, user, header_authorization, max_queries
+):
+    session.bulk_save_objects(ToDoFactory.create_batch(5, user_id=user.id))
+    session.commit()
+    to_do_id = session.scalar(select(ToDo.id).limit(1))
+
+    # one statement loads the user behind the token, one serves the route
+    with max_queries(2):
+        client.get(f'/todo/{to_do_id}', headers=header_authorization)
+    with max_queries(2):
+        client.get('/todo/', headers=header_authorization)
+    with max_queries(2):
+        client.get('/todo/stats', headers=header_authorization)
+
+
+def test_list_to_dos_reports_server_timing(client, header_authorization):
+    response = client.get('/todo/', headers=header_authorization)
+
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'db-slowest;dur=' in response.headers['Server-Timing']
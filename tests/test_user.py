@@ -1,5 +1,8 @@
 from http import HTTPStatus
 
+from fast_zero.routers.users import settings
+from tests.conftest import UserFactory
+
 
 def test_create_user(client):
     response = client.post(
@@ -51,7 +54,43 @@ def test_list_users(client, user_public_schema):
     response = client.get('/users/')
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_public_schema]}
+    assert response.json() == {'users': [user_public_schema], 'next_cursor': None}
+
+
+def test_list_users_cursor_walks_all_pages(session, client):
+    expected_users = 5
+    session.add_all(UserFactory.create_batch(5))
+    session.commit()
+
+    usernames = []
+    response = client.get('/users/?limit=2')
+    usernames.extend(user['username'] for user in response.json()['users'])
+
+    while cursor := response.json()['next_cursor']:
+        response = client.get(f'/users/?limit=2&cursor={cursor}')
+        usernames.extend(user['username'] for user in response.json()['users'])
+
+    assert len(usernames) == expected_users
+    assert len(set(usernames)) == expected_users
+
+
+def test_list_users_fast_serialization(session, client, monkeypatch):
+    session.add_all(UserFactory.create_batch(3))
+    session.commit()
+    expected = client.get('/users/?limit=2')
+
+    monkeypatch.setattr(settings, 'FAST_SERIALIZATION', True)
+    response = client.get('/users/?limit=2')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.content == expected.content
+
+
+def test_list_users_invalid_cursor(client):
+    response = client.get('/users/?cursor=e30')
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor.'}
 
 
 def test_get_user_ok(client, user_public_schema):
@@ -120,3 +159,22 @@ def test_delete_user_forbidden(client, user, other_user, token):
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permission'}
+
+
+def test_get_user_conditional(client, user, token):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'changed', 'email': 'changed@test.com', 'password': 'x'},
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag